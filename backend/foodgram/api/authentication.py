@@ -0,0 +1,108 @@
+"""Аутентификация по токену с кешированием.
+
+Токен с пользователем ищется в локальном LRU процесса, затем в общем
+кеше и только потом в базе. Ключи кеша — хеш токена, сам токен
+в кеш не попадает. Выход, смена пароля и деактивация сбрасывают запись
+(см. api.signals); в других процессах локальная копия живет не дольше
+TOKEN_LOCAL_TIMEOUT.
+"""
+import hashlib
+import pickle
+import threading
+from collections import Counter, OrderedDict
+from time import monotonic
+
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_CACHE_TIMEOUT = 60 * 5
+TOKEN_LOCAL_TIMEOUT = 10
+TOKEN_LOCAL_MAXSIZE = 1024
+
+
+class LocalLRUCache:
+    """Ограниченный по размеру LRU-кеш процесса с временем жизни записей"""
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = (monotonic() + self.timeout, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+
+local_tokens = LocalLRUCache(TOKEN_LOCAL_MAXSIZE, TOKEN_LOCAL_TIMEOUT)
+token_stats = Counter()
+
+
+def token_cache_key(key):
+    return 'auth:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidate_tokens(keys):
+    """Сбрасывает кеш для указанных токенов."""
+    cache_keys = [token_cache_key(key) for key in keys]
+    for cache_key in cache_keys:
+        local_tokens.delete(cache_key)
+    cache.delete_many(cache_keys)
+
+
+def get_token_stats():
+    """Счетчики попаданий и промахов кеша токенов в текущем процессе."""
+    return {
+        'local_hits': token_stats['local_hits'],
+        'shared_hits': token_stats['shared_hits'],
+        'misses': token_stats['misses'],
+        'local_size': len(local_tokens),
+    }
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication с локальным и общим кешем токенов"""
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        data = local_tokens.get(cache_key)
+        if data is not None:
+            token_stats['local_hits'] += 1
+        else:
+            data = cache.get(cache_key)
+            if data is not None:
+                token_stats['shared_hits'] += 1
+            else:
+                token_stats['misses'] += 1
+                user, token = super().authenticate_credentials(key)
+                data = pickle.dumps(token)
+                cache.set(cache_key, data, TOKEN_CACHE_TIMEOUT)
+            local_tokens.set(cache_key, data)
+        token = pickle.loads(data)
+        return token.user, token
@@ -0,0 +1,30 @@
+"""Проверки настроек, от которых зависит корректность кешей api."""
+import os
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=False)
+def check_shared_cache(app_configs, **kwargs):
+    """Версии кешей сбрасываются в том процессе, где прошла запись.
+    С локальным кешем процесса другие воркеры gunicorn этого
+    не увидят и будут отдавать устаревшие ответы."""
+    backend = settings.CACHES['default']['BACKEND']
+    workers = os.getenv('WEB_CONCURRENCY', '1')
+    if backend not in LOCAL_CACHE_BACKENDS or workers in ('', '1'):
+        return []
+    return [
+        Error(
+            f'{backend} не общий для {workers} воркеров gunicorn '
+            '(WEB_CONCURRENCY).',
+            hint='Задайте CACHE_BACKEND и CACHE_LOCATION общего кеша '
+                 '(например, Redis) или запускайте один воркер.',
+            id='api.E001',
+        )
+    ]
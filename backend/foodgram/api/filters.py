@@ -1,5 +1,14 @@
 from django_filters import rest_framework as filters
-from recipes.models import Recipe, Tag
+from recipes.cookable import COOKABLE_MAX_INGREDIENTS, filter_cookable
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import search_ingredient_names, search_recipes
+from rest_framework.exceptions import ValidationError
+
+from .user_recipes import get_favorite_ids, get_shopping_cart_ids
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
 
 
 class RecipeFilter(filters.FilterSet):
@@ -12,11 +21,46 @@ class RecipeFilter(filters.FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
+    ingredients = NumberInFilter(method='filter_ingredients')
+    max_missing = filters.NumberFilter(
+        method='filter_max_missing', min_value=0
+    )
+
+    # фильтры, доступные анониму
+    anonymous_filters = ('search', 'ingredients')
 
     def filter_queryset(self, queryset):
         queryset_filter = super().filter_queryset(queryset)
         if self.request.user.is_authenticated:
             return queryset_filter
+        for name in self.anonymous_filters:
+            value = self.form.cleaned_data.get(name)
+            if value:
+                queryset = self.filters[name].filter(queryset, value)
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_ingredients(self, queryset, name, value):
+        """Что можно приготовить из ингредиентов value; max_missing
+        ограничивает число недостающих ингредиентов."""
+        ingredient_ids = set(int(ingredient_id) for ingredient_id in value)
+        if len(ingredient_ids) > COOKABLE_MAX_INGREDIENTS:
+            raise ValidationError({
+                'ingredients': f'Не больше {COOKABLE_MAX_INGREDIENTS} '
+                               'ингредиентов'
+            })
+        max_missing = self.form.cleaned_data.get('max_missing')
+        return filter_cookable(
+            queryset,
+            ingredient_ids,
+            None if max_missing is None else int(max_missing),
+        )
+
+    def filter_max_missing(self, queryset, name, value):
+        # применяется вместе с ingredients в filter_ingredients
         return queryset
 
     def filter_is_favorited(self, queryset, name, value):
@@ -24,8 +68,8 @@ class RecipeFilter(filters.FilterSet):
         if user.is_anonymous:
             return queryset.none()
         if value:
-            # залазим в модель FavoriteRecipe
-            return queryset.filter(favoriterecipe__user=user)
+            # берем id из кешированного множества избранного
+            return queryset.filter(pk__in=get_favorite_ids(user.id))
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
@@ -33,10 +77,24 @@ class RecipeFilter(filters.FilterSet):
         if user.is_anonymous:
             return queryset.none()
         if value:
-            # залазим в модель ShooppingCart
-            return queryset.filter(shoppingcart__user=user)
+            # берем id из кешированного множества списка покупок
+            return queryset.filter(pk__in=get_shopping_cart_ids(user.id))
         return queryset
 
     class Meta:
         model = Recipe
-        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart']
+        fields = [
+            'tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+            'search', 'ingredients', 'max_missing',
+        ]
+
+
+class IngredientFilter(filters.FilterSet):
+    search = filters.CharFilter(method='filter_search')
+
+    def filter_search(self, queryset, name, value):
+        return search_ingredient_names(queryset, value)
+
+    class Meta:
+        model = Ingredient
+        fields = ['search']
@@ -0,0 +1,83 @@
+"""Префиксный индекс ингредиентов в памяти процесса для автодополнения.
+
+Имена приводятся к casefold с заменой ё на е и хранятся в отсортированном
+списке, префикс ищется бинарным поиском. Индекс строится при первом
+поиске и перестраивается, когда меняется версия в общем кеше: ее
+сбрасывают сигналы Ingredient и команда load_ingredients.
+"""
+import threading
+from bisect import bisect_left
+
+from django.core.cache import cache
+from recipes.models import Ingredient
+
+from .response_cache import get_version
+
+INGREDIENT_INDEX_VERSION_KEY = 'ingredients:index:version'
+INGREDIENT_SEARCH_LIMIT = 50
+INGREDIENT_SEARCH_LIMIT_MAX = 200
+
+
+def fold(text):
+    """Ключ поиска: casefold, ё как е, одиночные пробелы."""
+    return ' '.join(text.split()).casefold().replace('ё', 'е')
+
+
+class IngredientPrefixIndex:
+    """Отсортированные ключи имен и соответствующие им ингредиенты"""
+
+    def __init__(self, ingredients):
+        rows = sorted(
+            (fold(name), ingredient_id, name, measurement_unit)
+            for ingredient_id, name, measurement_unit in ingredients
+        )
+        self.keys = [row[0] for row in rows]
+        self.ingredients = [
+            {'id': ingredient_id, 'name': name,
+             'measurement_unit': measurement_unit}
+            for _, ingredient_id, name, measurement_unit in rows
+        ]
+
+    def search(self, prefix, limit):
+        """Не больше limit ингредиентов, имя которых начинается
+        с prefix."""
+        prefix = fold(prefix)
+        results = []
+        position = bisect_left(self.keys, prefix)
+        while (
+            position < len(self.keys)
+            and len(results) < limit
+            and self.keys[position].startswith(prefix)
+        ):
+            results.append(self.ingredients[position])
+            position += 1
+        return results
+
+
+index = None
+index_version = None
+index_lock = threading.Lock()
+
+
+def get_index():
+    """Индекс текущей версии, при необходимости перестроенный."""
+    global index, index_version
+    version = get_version(INGREDIENT_INDEX_VERSION_KEY)
+    if index is None or index_version != version:
+        with index_lock:
+            if index is None or index_version != version:
+                index = IngredientPrefixIndex(
+                    Ingredient.objects.values_list(
+                        'id', 'name', 'measurement_unit'
+                    )
+                )
+                index_version = version
+    return index
+
+
+def search_ingredients(prefix, limit=INGREDIENT_SEARCH_LIMIT):
+    return get_index().search(prefix, limit)
+
+
+def invalidate_ingredient_index():
+    cache.delete(INGREDIENT_INDEX_VERSION_KEY)
@@ -0,0 +1,81 @@
+from time import perf_counter
+
+from api.ingredient_index import INGREDIENT_SEARCH_LIMIT, IngredientPrefixIndex
+from django.core.management.base import BaseCommand, CommandError
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск ингредиентов по началу имени в базе '
+        '(istartswith) и в индексе в памяти.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sample',
+            type=int,
+            default=200,
+            help='Сколько имен взять для построения префиксов.',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=INGREDIENT_SEARCH_LIMIT,
+            help='Ограничение числа результатов.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Сколько раз повторить замер.',
+        )
+
+    def measure(self, search, prefixes, repeat):
+        """Лучшее время из repeat проходов по всем префиксам."""
+        best = None
+        for _ in range(repeat):
+            started = perf_counter()
+            for prefix in prefixes:
+                search(prefix)
+            elapsed = perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def handle(self, *args, **options):
+        names = list(
+            Ingredient.objects.order_by('?')
+            .values_list('name', flat=True)[:options['sample']]
+        )
+        if not names:
+            raise CommandError('Нет ингредиентов для проверки')
+        prefixes = sorted({
+            name[:length] for name in names for length in (1, 2, 3)
+        })
+        limit = options['limit']
+        started = perf_counter()
+        index = IngredientPrefixIndex(
+            Ingredient.objects.values_list('id', 'name', 'measurement_unit')
+        )
+        self.stdout.write(
+            f'Построение индекса: {(perf_counter() - started) * 1e3:.1f} мс'
+        )
+        database_time = self.measure(
+            lambda prefix: list(
+                Ingredient.objects.filter(name__istartswith=prefix)
+                .values('id', 'name', 'measurement_unit')[:limit]
+            ),
+            prefixes,
+            options['repeat'],
+        )
+        index_time = self.measure(
+            lambda prefix: index.search(prefix, limit),
+            prefixes,
+            options['repeat'],
+        )
+        count = len(prefixes)
+        self.stdout.write(self.style.SUCCESS(
+            f'{count} префиксов: база {database_time / count * 1e6:.1f} мкс, '
+            f'индекс {index_time / count * 1e6:.1f} мкс на запрос '
+            f'(x{database_time / index_time:.1f})'
+        ))
@@ -0,0 +1,117 @@
+import json
+from time import perf_counter
+
+from api.representations import (SHORT_RECIPE_FIELDS, fetch_recipe_rows,
+                                 render_recipe_documents, render_short_recipes)
+from api.serializers import RecipeDocumentSerializer, RecipeUserSerializer
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+from django.test import RequestFactory
+from recipes.models import IngredientRecipeAmount, Recipe, Tag
+
+
+def dump(data):
+    return json.dumps(data, ensure_ascii=False).encode()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет быстрое представление рецептов с сериализаторами DRF '
+        'байт в байт и замеряет стоимость сериализации одного рецепта.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sample',
+            type=int,
+            default=500,
+            help='Сколько рецептов взять для проверки.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Сколько раз повторить замер.',
+        )
+
+    def measure(self, render, repeat):
+        """Лучшее время из repeat запусков и результат рендера."""
+        best = None
+        for _ in range(repeat):
+            started = perf_counter()
+            result = render()
+            elapsed = perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def report(self, title, count, serializer_time, fast_time):
+        self.stdout.write(
+            f'{title}: DRF {serializer_time / count * 1e6:.1f} мкс, '
+            f'быстрый путь {fast_time / count * 1e6:.1f} мкс на рецепт '
+            f'(x{serializer_time / fast_time:.1f})'
+        )
+
+    def handle(self, *args, **options):
+        recipe_ids = list(
+            Recipe.objects.order_by('pk')
+            .values_list('pk', flat=True)[:options['sample']]
+        )
+        if not recipe_ids:
+            raise CommandError('Нет рецептов для проверки')
+        repeat = options['repeat']
+        errors = []
+
+        recipes = list(
+            Recipe.objects.filter(pk__in=recipe_ids)
+            .order_by('pk')
+            .select_related('author')
+            .prefetch_related(
+                Prefetch(
+                    'ingredient_used',
+                    queryset=IngredientRecipeAmount.objects.select_related(
+                        'ingredient'
+                    ).order_by('pk'),
+                ),
+                Prefetch('tags', queryset=Tag.objects.order_by('pk')),
+            )
+        )
+        serializer_time, expected = self.measure(
+            lambda: RecipeDocumentSerializer(recipes, many=True).data,
+            repeat,
+        )
+        rows = fetch_recipe_rows(recipe_ids)
+        fast_time, documents = self.measure(
+            lambda: render_recipe_documents(*rows), repeat
+        )
+        for item in expected:
+            if dump(item) != dump(documents[item['id']]):
+                errors.append(f'документ рецепта {item["id"]}')
+        self.report('Рецепт', len(recipes), serializer_time, fast_time)
+
+        request = RequestFactory().get('/')
+        short_recipes = Recipe.objects.filter(pk__in=recipe_ids).order_by('pk')
+        short_rows = list(short_recipes.values(*SHORT_RECIPE_FIELDS))
+        short_recipes = list(short_recipes)
+        for context_request in (None, request):
+            serializer_time, expected = self.measure(
+                lambda: RecipeUserSerializer(
+                    short_recipes,
+                    many=True,
+                    context={'request': context_request},
+                ).data,
+                repeat,
+            )
+            fast_time, result = self.measure(
+                lambda: render_short_recipes(short_rows, context_request),
+                repeat,
+            )
+            title = 'Краткий рецепт' + (
+                ' с абсолютным URL' if context_request else ''
+            )
+            if dump(expected) != dump(result):
+                errors.append(title)
+            self.report(title, len(short_rows), serializer_time, fast_time)
+
+        if errors:
+            raise CommandError('Расхождения: ' + ', '.join(errors))
+        self.stdout.write(self.style.SUCCESS('Вывод совпадает'))
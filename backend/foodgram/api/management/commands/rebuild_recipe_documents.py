@@ -0,0 +1,29 @@
+from api.representations import rebuild_recipe_documents
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает сохраненные JSON-документы рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipe',
+            type=int,
+            action='append',
+            dest='recipe_ids',
+            help='Ограничить рецептами с указанными id.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Сколько рецептов обрабатывать за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_recipe_documents(
+            options['recipe_ids'], chunk_size=options['chunk_size']
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Документы пересобраны: {count}')
+        )
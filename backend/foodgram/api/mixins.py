@@ -1,7 +1,43 @@
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
 from rest_framework import mixins, viewsets
 
+from .reference_data import REFERENCE_MAX_AGE, get_payload
+from .utils import get_not_modified
+
 
 class CreateDestroyView(
     mixins.CreateModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet
 ):
     pass
+
+
+class ReferenceListMixin:
+    """Список справочника из заранее отрендеренного ответа
+    со строгим ETag; JSON отдается в gzip, если клиент его принимает."""
+
+    reference_name = None
+
+    def get_reference_data(self):
+        return self.get_serializer(self.get_queryset(), many=True).data
+
+    def list(self, request, *args, **kwargs):
+        # готовый ответ только для полного списка в JSON
+        if request.accepted_renderer.format != 'json' or request.query_params:
+            return super().list(request, *args, **kwargs)
+        payload = get_payload(self.reference_name, self.get_reference_data)
+        use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+        etag = quote_etag(payload['etag'] + ('-gzip' if use_gzip else ''))
+        response = get_not_modified(request, etag)
+        if response is None:
+            response = HttpResponse(
+                payload['gzip'] if use_gzip else payload['content'],
+                content_type='application/json',
+            )
+            response['ETag'] = etag
+            if use_gzip:
+                response['Content-Encoding'] = 'gzip'
+        patch_cache_control(response, public=True, max_age=REFERENCE_MAX_AGE)
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
@@ -1,5 +1,110 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator, который для больших выборок берет количество
+    из оценки планировщика PostgreSQL вместо COUNT(*).
+
+    Ниже порога estimate_threshold и на других СУБД (SQLite в тестах)
+    считает точно.
+    """
+
+    estimate_threshold = 10000
+    count_is_exact = True
+
+    def get_estimated_count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    @cached_property
+    def count(self):
+        estimated_count = self.get_estimated_count()
+        if (
+            estimated_count is not None
+            and estimated_count > self.estimate_threshold
+        ):
+            self.count_is_exact = False
+            return estimated_count
+        return super().count
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.page.paginator.count,
+            'count_is_exact': self.page.paginator.count_is_exact,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_is_exact'] = {
+            'type': 'boolean',
+            'example': True,
+        }
+        return response_schema
+
+
+class CustomCursorPagination(CursorPagination):
+    """Курсорная пагинация по сортировке представления (view.ordering):
+    без COUNT(*) и OFFSET, время ответа не зависит от глубины."""
+
+    page_size_query_param = 'limit'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'ordering', None)
+        if ordering:
+            return (ordering,) if isinstance(ordering, str) else ordering
+        return super().get_ordering(request, queryset, view)
+
+
+class CursorOptionalPagination(CustomPagination):
+    """Постраничная пагинация (page/limit) с переключением
+    на курсорную по параметру pagination=cursor или cursor=..."""
+
+    cursor_pagination_class = CustomCursorPagination
+    mode_query_param = 'pagination'
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_pagination_class.cursor_query_param
+            in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,55 @@
+"""Готовые ответы справочников (теги, ингредиенты).
+
+Список рендерится один раз в байты JSON и gzip и хранится в общем
+кеше под версией, которую сбрасывают сигналы Tag и Ingredient.
+Процесс держит последнюю версию у себя, поэтому ответ и 304
+на условный запрос обходятся без базы и без разбора данных из кеша.
+"""
+import gzip
+import hashlib
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from .response_cache import get_version
+
+REFERENCE_CACHE_TIMEOUT = 60 * 60 * 24
+REFERENCE_MAX_AGE = 60
+
+local_payloads = {}
+
+
+def reference_version_key(name):
+    return f'reference:{name}:version'
+
+
+def render_payload(data):
+    content = JSONRenderer().render(data)
+    return {
+        'etag': hashlib.sha256(content).hexdigest()[:32],
+        'content': content,
+        'gzip': gzip.compress(content, mtime=0),
+    }
+
+
+def get_payload(name, get_data):
+    """Готовый ответ справочника name; get_data вызывается только
+    при отсутствии текущей версии в кеше."""
+    version = get_version(reference_version_key(name))
+    cache_key = f'reference:{name}:{version}'
+    local = local_payloads.get(name)
+    if local is not None and local[0] == cache_key:
+        return local[1]
+    payload = cache.get(cache_key)
+    if payload is None:
+        payload = render_payload(get_data())
+        cache.set(cache_key, payload, REFERENCE_CACHE_TIMEOUT)
+    local_payloads[name] = (cache_key, payload)
+    return payload
+
+
+def invalidate_reference(name):
+    """Сбрасывает версию справочника после фиксации транзакции."""
+    version_key = reference_version_key(name)
+    transaction.on_commit(lambda: cache.delete(version_key))
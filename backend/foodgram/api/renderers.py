@@ -0,0 +1,117 @@
+import csv
+import io
+import json
+import os
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer
+
+PDF_FONT_NAME = 'ShoppingCartFont'
+
+
+class ShoppingCartRenderer(BaseRenderer):
+    """Базовый рендерер списка покупок.
+
+    Ожидает список строк вида {'name', 'unit', 'total'}.
+    Ответы с ошибками (словарь) отдаются как JSON.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return json.dumps(data, ensure_ascii=False).encode('utf-8')
+        return self.render_shopping_cart(data)
+
+    def render_shopping_cart(self, items):
+        raise NotImplementedError(
+            'Метод render_shopping_cart должен быть переопределен'
+        )
+
+
+class ShoppingCartTextRenderer(ShoppingCartRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def render_shopping_cart(self, items):
+        return ''.join(
+            f"{item['name']} ({item['unit']}) — {item['total']}\n"
+            for item in items
+        ).encode(self.charset)
+
+
+class ShoppingCartCSVRenderer(ShoppingCartRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def render_shopping_cart(self, items):
+        stream = io.StringIO()
+        writer = csv.writer(stream)
+        writer.writerow(('name', 'measurement_unit', 'amount'))
+        for item in items:
+            writer.writerow((item['name'], item['unit'], item['total']))
+        return stream.getvalue().encode(self.charset)
+
+
+class ShoppingCartJSONRenderer(ShoppingCartRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def render_shopping_cart(self, items):
+        return json.dumps(
+            [
+                {
+                    'name': item['name'],
+                    'measurement_unit': item['unit'],
+                    'amount': item['total'],
+                }
+                for item in items
+            ],
+            ensure_ascii=False,
+        ).encode(self.charset)
+
+
+class ShoppingCartPDFRenderer(ShoppingCartRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    font_size = 12
+    line_height = 7 * mm
+    margin = 20 * mm
+
+    def get_font_name(self):
+        """Шрифт с кириллицей из SHOPPING_CART_PDF_FONT,
+        при его отсутствии — встроенный Helvetica."""
+        if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+            return PDF_FONT_NAME
+        font_path = settings.SHOPPING_CART_PDF_FONT
+        if not os.path.exists(font_path):
+            return 'Helvetica'
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+        return PDF_FONT_NAME
+
+    def render_shopping_cart(self, items):
+        stream = io.BytesIO()
+        pdf = canvas.Canvas(stream, pagesize=A4, invariant=True)
+        font_name = self.get_font_name()
+        _, height = A4
+        y = height - self.margin
+        pdf.setFont(font_name, self.font_size)
+        for item in items:
+            if y < self.margin:
+                pdf.showPage()
+                pdf.setFont(font_name, self.font_size)
+                y = height - self.margin
+            pdf.drawString(
+                self.margin,
+                y,
+                f"{item['name']} ({item['unit']}) — {item['total']}",
+            )
+            y -= self.line_height
+        pdf.save()
+        return stream.getvalue()
@@ -0,0 +1,174 @@
+"""Быстрое представление рецептов только для чтения.
+
+Строит те же словари, что RecipeDocumentSerializer и RecipeUserSerializer,
+из строк .values() и заранее собранных словарей связей, не создавая
+полей сериализатора на каждый объект. Совпадение вывода проверяет
+manage.py check_representations.
+"""
+import json
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from recipes.models import IngredientRecipeAmount, Recipe
+
+SHORT_RECIPE_FIELDS = ('id', 'name', 'image', 'cooking_time')
+
+
+def media_url(name, request=None):
+    """URL файла, как его отдает ImageField сериализатора."""
+    if not name:
+        return None
+    url = default_storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def dump_document(document):
+    return json.dumps(document, ensure_ascii=False, separators=(',', ':'))
+
+
+def fetch_recipe_rows(recipe_ids):
+    """Строки рецептов и словари их ингредиентов и тегов: три запроса
+    на любое число рецептов."""
+    recipes = list(
+        Recipe.objects.filter(pk__in=recipe_ids)
+        .order_by('pk')
+        .values(
+            'id',
+            'name',
+            'text',
+            'cooking_time',
+            'image',
+            'author__id',
+            'author__username',
+            'author__email',
+            'author__first_name',
+            'author__last_name',
+        )
+    )
+    ingredients = defaultdict(list)
+    for recipe_id, *ingredient in (
+        IngredientRecipeAmount.objects.filter(recipe_id__in=recipe_ids)
+        .order_by('pk')
+        .values_list(
+            'recipe_id',
+            'ingredient_id',
+            'amount',
+            'ingredient__measurement_unit',
+            'ingredient__name',
+        )
+    ):
+        ingredients[recipe_id].append(ingredient)
+    tags = defaultdict(list)
+    for recipe_id, *tag in (
+        Recipe.tags.through.objects.filter(recipe_id__in=recipe_ids)
+        .order_by('tag_id')
+        .values_list(
+            'recipe_id', 'tag_id', 'tag__name', 'tag__color', 'tag__slug'
+        )
+    ):
+        tags[recipe_id].append(tag)
+    return recipes, ingredients, tags
+
+
+def render_recipe_documents(recipes, ingredients, tags):
+    """{recipe_id: документ} в формате RecipeDocumentSerializer."""
+    return {
+        recipe['id']: {
+            'id': recipe['id'],
+            'ingredients': [
+                {
+                    'id': ingredient_id,
+                    'amount': amount,
+                    'measurement_unit': measurement_unit,
+                    'name': name,
+                }
+                for ingredient_id, amount, measurement_unit, name
+                in ingredients[recipe['id']]
+            ],
+            'tags': [
+                {'id': tag_id, 'name': name, 'color': color, 'slug': slug}
+                for tag_id, name, color, slug in tags[recipe['id']]
+            ],
+            'image': media_url(recipe['image']),
+            'name': recipe['name'],
+            'text': recipe['text'],
+            'cooking_time': recipe['cooking_time'],
+            'author': {
+                'id': recipe['author__id'],
+                'username': recipe['author__username'],
+                'email': recipe['author__email'],
+                'first_name': recipe['author__first_name'],
+                'last_name': recipe['author__last_name'],
+            },
+        }
+        for recipe in recipes
+    }
+
+
+def build_recipe_documents(recipe_ids):
+    return render_recipe_documents(*fetch_recipe_rows(recipe_ids))
+
+
+def rebuild_recipe_documents(recipe_ids=None, chunk_size=500):
+    """Пересобирает Recipe.document для указанных (или всех) рецептов
+    пачками по chunk_size. Возвращает число обновленных рецептов."""
+    queryset = Recipe.objects.order_by('pk')
+    if recipe_ids is not None:
+        queryset = queryset.filter(pk__in=list(recipe_ids))
+    recipe_ids = list(queryset.values_list('pk', flat=True))
+    for start in range(0, len(recipe_ids), chunk_size):
+        documents = build_recipe_documents(
+            recipe_ids[start:start + chunk_size]
+        )
+        Recipe.objects.bulk_update(
+            [
+                Recipe(pk=recipe_id, document=dump_document(document))
+                for recipe_id, document in documents.items()
+            ],
+            ['document'],
+        )
+    return len(recipe_ids)
+
+
+def render_short_recipes(rows, request=None):
+    """Список рецептов в формате RecipeUserSerializer из строк
+    .values(*SHORT_RECIPE_FIELDS)."""
+    return [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'image': media_url(row['image'], request),
+            'cooking_time': row['cooking_time'],
+        }
+        for row in rows
+    ]
+
+
+def fetch_latest_recipes(author_ids, limit, request=None):
+    """Не более limit новейших рецептов каждого автора одним запросом
+    с оконной функцией: {author_id: [рецепт в формате
+    RecipeUserSerializer]}."""
+    rows = (
+        Recipe.objects.filter(author_id__in=author_ids)
+        .annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F('author_id'),
+                order_by=(F('created_at').desc(), F('id').desc()),
+            )
+        )
+        .filter(row_number__lte=limit)
+        .order_by('author_id', 'row_number')
+        .values('author_id', *SHORT_RECIPE_FIELDS)
+    )
+    recipes = defaultdict(list)
+    for row in rows:
+        recipes[row['author_id']].append(row)
+    return {
+        author_id: render_short_recipes(author_rows, request)
+        for author_id, author_rows in recipes.items()
+    }
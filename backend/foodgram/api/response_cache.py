@@ -0,0 +1,68 @@
+"""Кеш ответов списка и карточки рецептов для анонимных пользователей.
+
+Ключи содержат версию: страницы списка — общее поколение, карточка —
+версию своего рецепта. Инвалидация меняет версию, старые записи
+перестают читаться и вытесняются по таймауту.
+"""
+import hashlib
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.utils.http import urlencode
+
+RECIPES_CACHE_TIMEOUT = 60 * 15
+# пагинация и все фильтры RecipeFilter: любой из них меняет выдачу
+RECIPE_LIST_PARAMS = (
+    'author',
+    'cursor',
+    'ingredients',
+    'is_favorited',
+    'is_in_shopping_cart',
+    'limit',
+    'max_missing',
+    'page',
+    'pagination',
+    'search',
+    'tags',
+)
+LIST_VERSION_KEY = 'recipes:list:version'
+
+
+def get_version(version_key):
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, uuid4().hex, None)
+        version = cache.get(version_key)
+    return version
+
+
+def recipe_version_key(recipe_id):
+    return f'recipes:detail:version:{recipe_id}'
+
+
+def recipe_list_cache_key(request):
+    """Ключ по нормализованной строке запроса: только значимые
+    параметры, в отсортированном порядке."""
+    query = urlencode(
+        [
+            (param, sorted(request.query_params.getlist(param)))
+            for param in RECIPE_LIST_PARAMS
+            if param in request.query_params
+        ],
+        doseq=True,
+    )
+    digest = hashlib.md5(f'{request.get_host()}?{query}'.encode()).hexdigest()
+    return f'recipes:list:{get_version(LIST_VERSION_KEY)}:{digest}'
+
+
+def recipe_detail_cache_key(request, recipe_id):
+    version = get_version(recipe_version_key(recipe_id))
+    return f'recipes:detail:{request.get_host()}:{recipe_id}:{version}'
+
+
+def invalidate_recipes(recipe_ids):
+    """Сбрасывает карточки указанных рецептов и все страницы списка."""
+    cache.delete_many(
+        [LIST_VERSION_KEY]
+        + [recipe_version_key(recipe_id) for recipe_id in recipe_ids]
+    )
@@ -1,16 +1,115 @@
-from django.db import transaction
+import json
+
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
+from recipes import feed, shopping_list, similarity
 from recipes.models import (FavoriteRecipe, Ingredient, IngredientRecipeAmount,
                             Recipe, ShoppingCart, Tag)
 from rest_framework import serializers
 from users.models import Subscription, User
 
+from .representations import rebuild_recipe_documents
+from .user_recipes import FAVORITES, SHOPPING_CART, invalidate_recipe_ids
+
+RECIPE_DOES_NOT_EXIST = 'Рецепт с указанным id не существует'
+
+
+class BaseRecipeActionSerializer(serializers.ModelSerializer):
+    """Базовый сериализатор Избранного и Списка покупок"""
+
+    recipe_field = None
+    user_recipes_kind = None
+    already_exists_error = None
+
+    def recipes_added(self, user, recipe_ids):
+        """Действия после пакетной вставки, в той же транзакции:
+        bulk_create не отправляет post_save."""
+
+    @transaction.atomic
+    def create(self, validated_data):
+        recipe_id = self.context['view'].kwargs['recipe_id']
+        user = self.context['request'].user
+        try:
+            recipe = Recipe.objects.get(id=recipe_id)
+        except Recipe.DoesNotExist:
+            raise serializers.ValidationError(
+                {'error': RECIPE_DOES_NOT_EXIST}
+            )
+        try:
+            with transaction.atomic():
+                item = self.Meta.model.objects.create(
+                    user=user, **{self.recipe_field: recipe}
+                )
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {'error': self.already_exists_error}
+            )
+        invalidate_recipe_ids(self.user_recipes_kind, user.id)
+        return item
 
-class ShoppingCartSerializer(serializers.ModelSerializer):
+    @transaction.atomic
+    def create_many(self, recipe_ids):
+        """Добавляет рецепты одной вставкой. Возвращает пары
+        (recipe_id, объект или словарь ошибки) в порядке запроса."""
+        user = self.context['request'].user
+        model = self.Meta.model
+        recipes = Recipe.objects.in_bulk(recipe_ids)
+        existing = set(
+            model.objects.filter(
+                user=user, **{f'{self.recipe_field}__in': recipes}
+            ).values_list(self.recipe_field, flat=True)
+        )
+        results = []
+        for recipe_id in recipe_ids:
+            if recipe_id not in recipes:
+                results.append(
+                    (recipe_id, {'error': RECIPE_DOES_NOT_EXIST})
+                )
+            elif recipe_id in existing:
+                results.append(
+                    (recipe_id, {'error': self.already_exists_error})
+                )
+            else:
+                existing.add(recipe_id)
+                results.append((recipe_id, model(
+                    user=user, **{self.recipe_field: recipes[recipe_id]}
+                )))
+        items = [item for _, item in results if isinstance(item, model)]
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(items)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {'error': 'Список изменился во время запроса, повторите'}
+            )
+        if items:
+            self.recipes_added(
+                user, [getattr(item, self.recipe_field).id for item in items]
+            )
+            invalidate_recipe_ids(self.user_recipes_kind, user.id)
+        return results
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Сериализатор списка id рецептов для пакетных операций"""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+
+
+class ShoppingCartSerializer(BaseRecipeActionSerializer):
     """Сериалайзер Список покупок добавить/удалить"""
 
+    recipe_field = 'shopping_recipe'
+    user_recipes_kind = SHOPPING_CART
+    already_exists_error = 'Рецепт уже в списке покупок'
+
     id = serializers.PrimaryKeyRelatedField(
         source='shopping_recipe.id', read_only=True
     )
@@ -29,23 +128,8 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
         read_only_fields = ('id', 'name', 'image', 'cooking_time')
 
-    def create(self, validated_data):
-        recipe_id = self.context['view'].kwargs['recipe_id']
-        user = self.context['request'].user
-        try:
-            recipe = Recipe.objects.get(id=recipe_id)
-        except Recipe.DoesNotExist:
-            raise serializers.ValidationError(
-                {'error': 'Рецепт с указанным id не существует'}
-            )
-        shopping_cart, created = ShoppingCart.objects.get_or_create(
-            shopping_recipe=recipe, user=user
-        )
-        if not created:
-            raise serializers.ValidationError(
-                {'error': 'Рецепт уже в списке покупок'}
-            )
-        return shopping_cart
+    def recipes_added(self, user, recipe_ids):
+        shopping_list.add_recipes(user.id, recipe_ids)
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -56,8 +140,40 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit')
 
 
+class IngredientPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """id ингредиента. Все ингредиенты из тела запроса загружаются
+    одним запросом при проверке первого из них."""
+
+    def get_requested_ingredients(self):
+        root = self.root
+        if not hasattr(root, 'requested_ingredients'):
+            ingredient_ids = set()
+            ingredients = getattr(root, 'initial_data', {}).get('ingredients')
+            for ingredient in ingredients or []:
+                try:
+                    ingredient_ids.add(int(ingredient['id']))
+                except (KeyError, TypeError, ValueError):
+                    continue
+            root.requested_ingredients = self.get_queryset().in_bulk(
+                ingredient_ids
+            )
+        return root.requested_ingredients
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        ingredient = self.get_requested_ingredients().get(pk)
+        if ingredient is None:
+            self.fail('does_not_exist', pk_value=data)
+        return ingredient
+
+
 class RecipeIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
+    id = IngredientPrimaryKeyField(
         queryset=Ingredient.objects.all(), source='ingredient'
     )
     measurement_unit = serializers.StringRelatedField(
@@ -98,6 +214,8 @@ class UserReadSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
         if user.is_authenticated:
             subscription_exist = Subscription.objects.filter(
@@ -132,9 +250,19 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('name', 'color', 'slug')
 
 
+class AuthorSerializer(serializers.ModelSerializer):
+    """Сериализатор автора без данных текущего пользователя"""
+
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'email', 'first_name', 'last_name')
+
+
 class RecipeReadSerializer(serializers.ModelSerializer):
     """Сериалайзер Рецепт GET"""
 
+    use_document = True
+
     ingredients = RecipeIngredientSerializer(
         many=True, source='ingredient_used'
     )
@@ -165,10 +293,52 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
         )
 
+    def to_representation(self, instance):
+        if self.use_document and instance.document:
+            return self.document_to_representation(instance)
+        return super().to_representation(instance)
+
+    def document_to_representation(self, instance):
+        """Сохраненный документ рецепта с флагами текущего пользователя,
+        без прохода по полям сериализатора."""
+        data = json.loads(instance.document)
+        request = self.context.get('request')
+        if data['image'] and request is not None:
+            data['image'] = request.build_absolute_uri(data['image'])
+        data['author']['is_subscribed'] = getattr(
+            instance, 'author_is_subscribed', False
+        )
+        for flag in ('is_favorited', 'is_in_shopping_cart'):
+            if hasattr(instance, flag):
+                data[flag] = getattr(instance, flag)
+        return data
+
+
+class RecipeDocumentSerializer(RecipeReadSerializer):
+    """Независимая от пользователя часть рецепта для Recipe.document"""
+
+    use_document = False
+    author = AuthorSerializer(read_only=True)
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'id',
+            'ingredients',
+            'tags',
+            'image',
+            'name',
+            'text',
+            'cooking_time',
+            'author',
+        )
+
 
 class RecipeCreateUpdateSerializer(RecipeReadSerializer):
     """Сериалайзер Рецепт POST/PATCH/DEL"""
 
+    use_document = False
+
     tags = serializers.PrimaryKeyRelatedField(
         many=True, queryset=Tag.objects.all()
     )
@@ -207,7 +377,9 @@ class RecipeCreateUpdateSerializer(RecipeReadSerializer):
             validated_data
         )
         author = self.context['request'].user
-        recipe = Recipe.objects.create(author=author, **validated_data)
+        recipe = Recipe.objects.create(
+            author=author, ingredients_count=len(ingredients), **validated_data
+        )
         recipe.tags.set(tags_data)
         ingredient_data = []
         for ingredient in ingredients:
@@ -219,24 +391,72 @@ class RecipeCreateUpdateSerializer(RecipeReadSerializer):
                 )
             )
         IngredientRecipeAmount.objects.bulk_create(ingredient_data)
+        rebuild_recipe_documents([recipe.id])
+        feed.fan_out_recipe(recipe)
+        similarity.refresh_recipe(recipe.id)
         return recipe
 
+    def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance],
+            Prefetch(
+                'ingredient_used',
+                queryset=IngredientRecipeAmount.objects.select_related(
+                    'ingredient'
+                ),
+            ),
+        )
+        return super().to_representation(instance)
+
+    def update_ingredients(self, recipe, ingredients):
+        """Приводит ингредиенты рецепта к списку ingredients по разнице
+        с текущими строками. Возвращает старые и новые количества."""
+        current = {
+            item.ingredient_id: item for item in recipe.ingredient_used.all()
+        }
+        old_amounts = {
+            ingredient_id: item.amount
+            for ingredient_id, item in current.items()
+        }
+        new_amounts = {
+            ingredient['ingredient'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        to_create, to_update = [], []
+        for ingredient_id, amount in new_amounts.items():
+            item = current.get(ingredient_id)
+            if item is None:
+                to_create.append(IngredientRecipeAmount(
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount
+                ))
+            elif item.amount != amount:
+                item.amount = amount
+                to_update.append(item)
+        to_delete = [
+            item.pk for ingredient_id, item in current.items()
+            if ingredient_id not in new_amounts
+        ]
+        if to_delete:
+            IngredientRecipeAmount.objects.filter(pk__in=to_delete).delete()
+        IngredientRecipeAmount.objects.bulk_create(to_create)
+        IngredientRecipeAmount.objects.bulk_update(to_update, ['amount'])
+        return old_amounts, new_amounts
+
     @transaction.atomic
     def update(self, instance, validated_data):
         ingredients, tags_data = self.get_ingredients_tags_data_or_error(
             validated_data
         )
         instance.tags.set(tags_data)
-        instance.ingredients.clear()
-        if ingredients:
-            for ingredient in ingredients:
-                current_ingredient = ingredient.get('ingredient')
-                amount = ingredient.get('amount')
-                instance.ingredients.add(
-                    current_ingredient, through_defaults={'amount': amount}
-                )
-            instance.save()
-        return super().update(instance, validated_data)
+        old_amounts, new_amounts = self.update_ingredients(
+            instance, ingredients
+        )
+        shopping_list.change_recipe(instance.id, old_amounts, new_amounts)
+        validated_data['ingredients_count'] = len(new_amounts)
+        instance = super().update(instance, validated_data)
+        rebuild_recipe_documents([instance.id])
+        similarity.refresh_recipe(instance.id)
+        return instance
 
 
 class RecipeUserSerializer(serializers.ModelSerializer):
@@ -256,7 +476,7 @@ class SubscriptionReadSerializer(serializers.ModelSerializer):
     first_name = serializers.StringRelatedField(source='author.first_name')
     last_name = serializers.StringRelatedField(source='author.last_name')
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -282,35 +502,11 @@ class SubscriptionReadSerializer(serializers.ModelSerializer):
             'is_subscribed',
         )
 
-    def get_recipes_count(self, obj):
-        user = obj.author
-        recipes_count = Recipe.objects.filter(author=user).count()
-        return recipes_count
-
     def get_recipes(self, obj):
-        recipes_limit = self.context['request'].query_params.get(
-            'recipes_limit'
-        )
-        user = obj.author
-        if recipes_limit:
-            recipes_limit = int(recipes_limit)
-            recipes = Recipe.objects.filter(author=user).order_by(
-                '-created_at'
-            )[:recipes_limit]
-        else:
-            recipes = Recipe.objects.filter(author=user).order_by(
-                '-created_at'
-            )
-        resipes = RecipeUserSerializer(recipes, many=True).data
-        return resipes
+        return self.context['author_recipes'].get(obj.author_id, [])
 
     def get_is_subscribed(self, obj):
-        author = obj.author
-        user = self.context['request'].user
-        subscription_exist = Subscription.objects.filter(
-            subscriber=user, author=author
-        ).exists()
-        return subscription_exist
+        return True
 
 
 class SubscriptionCreateSerializer(serializers.ModelSerializer):
@@ -355,6 +551,7 @@ class SubscriptionCreateSerializer(serializers.ModelSerializer):
         recipes_count = Recipe.objects.filter(author=author_id).count()
         return recipes_count
 
+    @transaction.atomic
     def create(self, validated_data):
         subscriber = self.context['request'].user
         author_id = self.context['view'].kwargs['author_id']
@@ -375,12 +572,17 @@ class SubscriptionCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 {'error': 'Вы уже подписаны на автора'}
             )
+        feed.backfill_subscription(subscriber.id, author.id)
         return author
 
 
-class FavoriteRecipeSerializer(serializers.ModelSerializer):
+class FavoriteRecipeSerializer(BaseRecipeActionSerializer):
     """Сериализатор Избранные рецепты"""
 
+    recipe_field = 'recipe'
+    user_recipes_kind = FAVORITES
+    already_exists_error = 'Рецепт уже в избранном'
+
     id = serializers.PrimaryKeyRelatedField(read_only=True, source='recipe.id')
     name = serializers.StringRelatedField(read_only=True, source='recipe.name')
     cooking_time = serializers.IntegerField(
@@ -392,21 +594,3 @@ class FavoriteRecipeSerializer(serializers.ModelSerializer):
         model = FavoriteRecipe
         fields = ('id', 'name', 'cooking_time', 'image')
         read_only_fields = ('id', 'name', 'cooking_time', 'image')
-
-    def create(self, validated_data):
-        user = self.context['request'].user
-        recipe_id = self.context['view'].kwargs['recipe_id']
-        try:
-            recipe = Recipe.objects.get(id=recipe_id)
-        except Recipe.DoesNotExist:
-            raise serializers.ValidationError(
-                {'error': 'Рецепт с указанным id не существует'}
-            )
-        favorite_recipe, created = FavoriteRecipe.objects.get_or_create(
-            recipe=recipe, user=user
-        )
-        if not created:
-            raise serializers.ValidationError(
-                {'error': 'Рецепт уже в избранном'}
-            )
-        return favorite_recipe
@@ -0,0 +1,143 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from recipes.cookable import update_ingredients_counts
+from recipes.models import Ingredient, IngredientRecipeAmount, Recipe, Tag
+from recipes.search import update_search_vectors
+from recipes.signals import ingredients_loaded, recipes_changed
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+from .authentication import invalidate_tokens
+from .ingredient_index import invalidate_ingredient_index
+from .reference_data import invalidate_reference
+from .representations import rebuild_recipe_documents
+from .response_cache import invalidate_recipes
+
+# Поля, изменение которых не отражается в ответах API.
+USER_SERVICE_FIELDS = {'last_login', 'password'}
+# Поля рецепта, из которых строится search_vector.
+SEARCH_FIELDS = {'name', 'text'}
+# Поля, изменение которых не требует сброса кеша токенов.
+USER_TOKEN_FIELDS = {'last_login'}
+
+
+def invalidate_recipes_on_commit(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    transaction.on_commit(lambda: invalidate_recipes(recipe_ids))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate_recipes_on_commit([instance.id])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_text_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not SEARCH_FIELDS & set(update_fields):
+        return
+    update_search_vectors([instance.id])
+
+
+@receiver(recipes_changed)
+def recipes_changed_outside_api(sender, recipe_ids, **kwargs):
+    rebuild_recipe_documents(recipe_ids)
+    invalidate_recipes_on_commit(recipe_ids)
+
+
+@receiver(post_save, sender=IngredientRecipeAmount)
+@receiver(post_delete, sender=IngredientRecipeAmount)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    invalidate_recipes_on_commit([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_recipes_on_commit([instance.id])
+    elif pk_set:
+        invalidate_recipes_on_commit(pk_set)
+    else:
+        invalidate_recipes_on_commit(
+            instance.recipes_tags.values_list('id', flat=True)
+        )
+
+
+@receiver(post_save, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    recipe_ids = list(instance.recipes_tags.values_list('id', flat=True))
+    rebuild_recipe_documents(recipe_ids)
+    invalidate_recipes_on_commit(recipe_ids)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    recipe_ids = list(instance.recipes.values_list('id', flat=True))
+    rebuild_recipe_documents(recipe_ids)
+    invalidate_recipes_on_commit(recipe_ids)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(ingredients_loaded)
+def ingredient_catalog_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_ingredient_index)
+    invalidate_reference('ingredients')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_catalog_changed(sender, **kwargs):
+    invalidate_reference('tags')
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def tag_or_ingredient_deleting(sender, instance, **kwargs):
+    related_recipes = (
+        instance.recipes_tags if sender is Tag else instance.recipes
+    )
+    instance.affected_recipe_ids = list(
+        related_recipes.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def tag_or_ingredient_deleted(sender, instance, **kwargs):
+    recipe_ids = getattr(instance, 'affected_recipe_ids', [])
+    if sender is Ingredient:
+        update_ingredients_counts(recipe_ids)
+    rebuild_recipe_documents(recipe_ids)
+    invalidate_recipes_on_commit(recipe_ids)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= USER_SERVICE_FIELDS:
+        return
+    recipe_ids = list(instance.recipes.values_list('id', flat=True))
+    if recipe_ids:
+        rebuild_recipe_documents(recipe_ids)
+        invalidate_recipes_on_commit(recipe_ids)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    keys = [instance.key]
+    transaction.on_commit(lambda: invalidate_tokens(keys))
+
+
+@receiver(post_save, sender=User)
+def user_credentials_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= USER_TOKEN_FIELDS:
+        return
+    keys = list(Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ))
+    if keys:
+        transaction.on_commit(lambda: invalidate_tokens(keys))
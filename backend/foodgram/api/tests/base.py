@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from recipes.models import Ingredient, IngredientRecipeAmount, Recipe, Tag
+from rest_framework.test import APITestCase
+from users.models import User
+
+
+class BaseAPITestCase(APITestCase):
+    """Общие данные тестов API: теги, ингредиенты и пустой кеш"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тег {number}', color=f'#00000{number}',
+                slug=f'tag{number}',
+            )
+            for number in range(3)
+        ]
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(40)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def create_user(username):
+        return User.objects.create_user(
+            username=username,
+            email=f'{username}@example.com',
+            password='password-12345',
+            first_name='Имя',
+            last_name='Фамилия',
+        )
+
+    def create_recipe(self, author, ingredients_count=3, offset=0, **fields):
+        """Рецепт с ingredients_count ингредиентами начиная с offset."""
+        fields.setdefault('name', 'Рецепт')
+        fields.setdefault('text', 'Описание')
+        fields.setdefault('cooking_time', 10)
+        recipe = Recipe.objects.create(
+            author=author,
+            image='recipe_images/test.png',
+            ingredients_count=ingredients_count,
+            **fields,
+        )
+        IngredientRecipeAmount.objects.bulk_create(
+            IngredientRecipeAmount(
+                recipe=recipe,
+                ingredient=self.ingredients[
+                    (offset + number) % len(self.ingredients)
+                ],
+                amount=number + 1,
+            )
+            for number in range(ingredients_count)
+        )
+        recipe.tags.set(self.tags[:2])
+        return recipe
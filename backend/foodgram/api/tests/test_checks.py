@@ -0,0 +1,32 @@
+import os
+from unittest import mock
+
+from api.checks import check_shared_cache
+from django.test import SimpleTestCase, override_settings
+
+LOCMEM = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}}
+REDIS = {'default': {
+    'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+    'LOCATION': 'redis://redis:6379/1',
+}}
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    """Локальный кеш процесса допустим только с одним воркером"""
+
+    def check(self, caches, workers):
+        with override_settings(CACHES=caches), mock.patch.dict(
+            os.environ, {'WEB_CONCURRENCY': workers}
+        ):
+            return [error.id for error in check_shared_cache(None)]
+
+    def test_single_worker_with_local_cache(self):
+        self.assertEqual(self.check(LOCMEM, '1'), [])
+
+    def test_many_workers_with_local_cache(self):
+        self.assertEqual(self.check(LOCMEM, '4'), ['api.E001'])
+
+    def test_many_workers_with_shared_cache(self):
+        self.assertEqual(self.check(REDIS, '4'), [])
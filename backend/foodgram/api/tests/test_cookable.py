@@ -0,0 +1,46 @@
+from unittest import mock
+
+from recipes.cookable import filter_cookable
+from recipes.models import Recipe
+
+from .base import BaseAPITestCase
+
+
+class CookableTests(BaseAPITestCase):
+    """Подбор по ингредиентам: порядок по доле имеющихся
+    и ограничение числа кандидатов"""
+
+    def setUp(self):
+        super().setUp()
+        author = self.create_user('author')
+        # у всех рецептов общий ингредиент 0, доля 1/n
+        self.recipes = [
+            self.create_recipe(author, ingredients_count=count)
+            for count in (4, 1, 3, 2)
+        ]
+
+    def cookable(self, **kwargs):
+        return list(filter_cookable(
+            Recipe.objects.all(), [self.ingredients[0].pk], **kwargs
+        ).values_list('pk', flat=True))
+
+    def test_order_by_coverage(self):
+        self.assertEqual(
+            self.cookable(),
+            [self.recipes[number].pk for number in (1, 3, 2, 0)],
+        )
+        self.assertEqual(
+            self.cookable(max_missing=1),
+            [self.recipes[number].pk for number in (1, 3)],
+        )
+
+    def test_candidates_limit(self):
+        with mock.patch('recipes.cookable.COOKABLE_CANDIDATES_LIMIT', 2):
+            self.assertEqual(
+                self.cookable(),
+                [self.recipes[number].pk for number in (1, 3)],
+            )
+            self.assertEqual(
+                self.cookable(max_missing=2),
+                [self.recipes[number].pk for number in (1, 3)],
+            )
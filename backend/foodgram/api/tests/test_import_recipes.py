@@ -0,0 +1,136 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, override_settings
+from recipes.models import Recipe
+from recipes.streams import iter_json_array, iter_ndjson
+
+from .base import BaseAPITestCase
+
+
+class StreamLimitsTests(SimpleTestCase):
+    """После битой записи файл не дочитывается в память целиком"""
+
+    def test_malformed_json_record(self):
+        stream = io.StringIO('[{"name": "a"}, {"name": ' + ' ' * 10 ** 6)
+        records = iter_json_array(stream, max_record_size=1000)
+        self.assertEqual(next(records), {'name': 'a'})
+        with self.assertRaises(ValueError):
+            next(records)
+        self.assertLess(stream.tell(), 10 ** 6)
+
+    def test_long_ndjson_line(self):
+        stream = io.StringIO('{"name": "a"}\n{"name": "' + 'b' * 10 ** 6)
+        records = iter_ndjson(stream, max_record_size=1000)
+        self.assertEqual(next(records), {'name': 'a'})
+        with self.assertRaises(ValueError):
+            next(records)
+        self.assertLess(stream.tell(), 10 ** 6)
+
+
+class ImportRollbackTests(BaseAPITestCase):
+    """Откат пачки удаляет уже сохраненные файлы изображений"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.media = os.path.join(self.directory, 'media')
+        self.images = os.path.join(self.directory, 'images')
+        os.makedirs(self.images)
+        with open(os.path.join(self.images, 'dish.png'), 'wb') as image:
+            image.write(b'png')
+        self.path = os.path.join(self.directory, 'recipes.ndjson')
+        self.write_records([self.make_record(number) for number in range(3)])
+
+    def make_record(self, number, **fields):
+        record = {
+            'name': f'рецепт {number}',
+            'text': 'текст',
+            'cooking_time': 5,
+            'image': 'dish.png',
+            'tags': [self.tags[0].slug],
+            'ingredients': [
+                {'id': self.ingredients[number].pk, 'amount': 1}
+            ],
+        }
+        record.update(fields)
+        return record
+
+    def write_records(self, records):
+        with open(self.path, 'w', encoding='utf-8') as stream:
+            for record in records:
+                stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def media_files(self):
+        return [
+            name for _, _, names in os.walk(self.media) for name in names
+        ]
+
+    def import_recipes(self):
+        stderr = io.StringIO()
+        with override_settings(MEDIA_ROOT=self.media):
+            call_command(
+                'import_recipes', self.path, images=self.images,
+                author=self.author.username, stdout=io.StringIO(),
+                stderr=stderr,
+            )
+        return stderr.getvalue()
+
+    def test_import(self):
+        self.import_recipes()
+        self.assertEqual(Recipe.objects.count(), 3)
+        self.assertEqual(len(self.media_files()), 3)
+
+    def test_rollback_removes_images(self):
+        with mock.patch(
+            'recipes.feed.fan_out_recipes', side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            self.import_recipes()
+        self.assertFalse(Recipe.objects.exists())
+        self.assertEqual(self.media_files(), [])
+
+    def test_format_error(self):
+        with open(self.path, 'w', encoding='utf-8') as stream:
+            stream.write('[{"name": ')
+        with self.assertRaises(CommandError):
+            self.import_recipes()
+
+    def test_invalid_records_skipped(self):
+        outside = os.path.join(self.directory, 'secret.png')
+        with open(outside, 'wb') as image:
+            image.write(b'png')
+        invalid = [
+            {'name': 123},
+            {'text': ['текст']},
+            {'image': ['dish.png']},
+            {'image': '../secret.png'},
+            {'image': outside},
+            {'cooking_time': True},
+            {'author': ['author']},
+            {'tags': [['t']]},
+            {'tags': 'tag0'},
+            {'ingredients': [{'id': [1], 'amount': 1}]},
+            {'ingredients': {'id': 1}},
+        ]
+        self.write_records(
+            [self.make_record(0)]
+            + [self.make_record(1, **fields) for fields in invalid]
+        )
+        errors = self.import_recipes()
+        self.assertEqual(Recipe.objects.count(), 1)
+        self.assertEqual(len(errors.splitlines()), len(invalid))
+        self.assertEqual(len(self.media_files()), 1)
+
+    def test_save_error_is_not_format_error(self):
+        with mock.patch(
+            'recipes.feed.fan_out_recipes', side_effect=ValueError
+        ), self.assertRaises(ValueError):
+            self.import_recipes()
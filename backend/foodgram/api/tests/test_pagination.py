@@ -0,0 +1,52 @@
+from unittest import mock
+
+from api.pagination import EstimatedCountPaginator
+from django.core.cache import cache
+from django.db import connection
+from recipes.models import Recipe
+
+from .base import BaseAPITestCase
+
+ESTIMATE = 'api.pagination.EstimatedCountPaginator.get_estimated_count'
+
+
+class EstimatedCountTests(BaseAPITestCase):
+    """Большие выборки считаются по оценке планировщика,
+    что отражает count_is_exact"""
+
+    def setUp(self):
+        super().setUp()
+        author = self.create_user('author')
+        for number in range(3):
+            self.create_recipe(author, offset=number)
+
+    def get_list(self):
+        cache.clear()
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_exact_count(self):
+        for estimate in (None, 5):
+            with self.subTest(estimate=estimate), mock.patch(
+                ESTIMATE, return_value=estimate
+            ):
+                data = self.get_list()
+                self.assertEqual(data['count'], 3)
+                self.assertIs(data['count_is_exact'], True)
+
+    def test_estimated_count(self):
+        estimate = EstimatedCountPaginator.estimate_threshold + 1
+        with mock.patch(ESTIMATE, return_value=estimate):
+            data = self.get_list()
+        self.assertEqual(data['count'], estimate)
+        self.assertIs(data['count_is_exact'], False)
+        self.assertEqual(len(data['results']), 3)
+
+    def test_no_estimate_outside_postgresql(self):
+        if connection.vendor == 'postgresql':
+            self.skipTest('оценка доступна только на PostgreSQL')
+        paginator = EstimatedCountPaginator(Recipe.objects.all(), 2)
+        self.assertIsNone(paginator.get_estimated_count())
+        self.assertEqual(paginator.count, 3)
+        self.assertTrue(paginator.count_is_exact)
@@ -0,0 +1,77 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.models import FavoriteRecipe, Recipe
+from users.models import Subscription
+
+from .base import BaseAPITestCase
+
+DETAIL_QUERIES = 4
+AUTHENTICATED_DETAIL_QUERIES = 6
+
+
+class RecipeReadQueryCountTests(BaseAPITestCase):
+    """Число запросов страницы не зависит от ее размера
+    и числа ингредиентов"""
+
+    def setUp(self):
+        super().setUp()
+        self.authors = [self.create_user(f'author{n}') for n in range(3)]
+        self.user = self.create_user('reader')
+        Subscription.objects.create(
+            subscriber=self.user, author=self.authors[0]
+        )
+
+    def create_recipes(self, count, ingredients_count):
+        Recipe.objects.all().delete()
+        recipes = [
+            self.create_recipe(
+                self.authors[number % len(self.authors)],
+                ingredients_count=ingredients_count,
+                offset=number,
+            )
+            for number in range(count)
+        ]
+        FavoriteRecipe.objects.create(user=self.user, recipe=recipes[0])
+        return recipes
+
+    def count_list_queries(self, limit):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/recipes/', {'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), limit)
+        return len(queries)
+
+    def test_list(self):
+        # точное число зависит от СУБД: на PostgreSQL пагинатор
+        # добавляет EXPLAIN для оценки количества
+        counts = {None: set(), self.user: set()}
+        for recipes_count, ingredients_count in ((2, 1), (10, 5), (20, 15)):
+            self.create_recipes(recipes_count, ingredients_count)
+            for user, user_counts in counts.items():
+                self.client.force_authenticate(user)
+                user_counts.add(self.count_list_queries(recipes_count))
+        for user, user_counts in counts.items():
+            with self.subTest(user=user):
+                self.assertEqual(len(user_counts), 1, user_counts)
+
+    def test_detail(self):
+        for ingredients_count in (1, 5, 15):
+            with self.subTest(ingredients=ingredients_count):
+                recipe = self.create_recipes(1, ingredients_count)[0]
+                for user, queries in (
+                    (None, DETAIL_QUERIES),
+                    (self.user, AUTHENTICATED_DETAIL_QUERIES),
+                ):
+                    cache.clear()
+                    self.client.force_authenticate(user)
+                    with self.assertNumQueries(queries):
+                        response = self.client.get(
+                            f'/api/recipes/{recipe.id}/'
+                        )
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(
+                        len(response.json()['ingredients']),
+                        ingredients_count,
+                    )
@@ -0,0 +1,48 @@
+import ast
+import json
+
+from django.conf import settings
+from recipes.models import Ingredient, Recipe
+from recipes.signals import ingredients_loaded, recipes_changed
+
+from .base import BaseAPITestCase
+
+
+class RecipesSignalsTests(BaseAPITestCase):
+    """Изменения в обход API доходят до api через сигналы recipes"""
+
+    def test_recipes_changed_rebuilds_document(self):
+        recipe = self.create_recipe(self.create_user('author'))
+        recipe.ingredient_used.update(amount=77)
+        recipes_changed.send(sender=Recipe, recipe_ids=[recipe.pk])
+        recipe.refresh_from_db()
+        document = json.loads(recipe.document)
+        self.assertEqual(
+            {item['amount'] for item in document['ingredients']}, {77}
+        )
+
+    def test_ingredients_loaded_invalidates_reference(self):
+        url = '/api/ingredients/'
+        before = len(self.client.get(url).json())
+        Ingredient.objects.bulk_create(
+            [Ingredient(name='новый', measurement_unit='г')]
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredients_loaded.send(sender=Ingredient)
+        self.assertEqual(len(self.client.get(url).json()), before + 1)
+
+    def test_recipes_do_not_import_api(self):
+        imports = []
+        for path in (settings.BASE_DIR / 'recipes').rglob('*.py'):
+            for node in ast.walk(ast.parse(path.read_text())):
+                if isinstance(node, ast.ImportFrom) and node.module:
+                    names = [node.module]
+                elif isinstance(node, ast.Import):
+                    names = [alias.name for alias in node.names]
+                else:
+                    continue
+                imports.extend(
+                    f'{path.name}: {name}' for name in names
+                    if name.split('.')[0] == 'api'
+                )
+        self.assertEqual(imports, [])
@@ -0,0 +1,120 @@
+from api.representations import (SHORT_RECIPE_FIELDS, build_recipe_documents,
+                                 dump_document, render_short_recipes)
+from api.serializers import (RecipeDocumentSerializer, RecipeReadSerializer,
+                             RecipeUserSerializer)
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import Exists, OuterRef, Prefetch
+from django.test import RequestFactory
+from recipes.models import IngredientRecipeAmount, Recipe, Tag
+from rest_framework.renderers import JSONRenderer
+from users.models import Subscription
+
+from .base import BaseAPITestCase
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+class RecipeSerializerForTest(RecipeReadSerializer):
+    use_document = False
+
+
+class RepresentationParityTests(BaseAPITestCase):
+    """Быстрый путь совпадает с сериализаторами DRF байт в байт"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.author.first_name = 'Имя "в кавычках" \\ 🍲'
+        self.author.save()
+        self.reader = self.create_user('reader')
+        Subscription.objects.create(subscriber=self.reader, author=self.author)
+        self.recipes = [
+            self.create_recipe(self.author, ingredients_count=0),
+            self.create_recipe(
+                self.author, ingredients_count=1, name='Борщ </script>'
+            ),
+            self.create_recipe(
+                self.author,
+                ingredients_count=12,
+                offset=5,
+                text='Строка\nс переводом и юникодом: ё, 🍅,  ',
+            ),
+        ]
+        self.recipes[0].tags.set([])
+        self.recipes[2].tags.set(reversed(self.tags))
+        self.request = RequestFactory().get('/api/recipes/')
+        self.request.user = self.reader
+        self.anonymous_request = RequestFactory().get('/api/recipes/')
+        self.anonymous_request.user = AnonymousUser()
+
+    def get_recipes(self, user=None):
+        """Рецепты, подготовленные как в RecipeViewSet."""
+        queryset = Recipe.objects.filter(
+            pk__in=[recipe.id for recipe in self.recipes]
+        )
+        if user is not None:
+            queryset = queryset.annotate(
+                author_is_subscribed=Exists(
+                    Subscription.objects.filter(
+                        subscriber=user, author=OuterRef('author')
+                    )
+                )
+            )
+        return list(
+            queryset.order_by('pk')
+            .select_related('author')
+            .prefetch_related(
+                Prefetch(
+                    'ingredient_used',
+                    queryset=IngredientRecipeAmount.objects.select_related(
+                        'ingredient'
+                    ).order_by('pk'),
+                ),
+                Prefetch('tags', queryset=Tag.objects.order_by('pk')),
+            )
+        )
+
+    def test_recipe_documents(self):
+        documents = build_recipe_documents([r.id for r in self.recipes])
+        for recipe in self.get_recipes():
+            with self.subTest(recipe=recipe.id):
+                self.assertEqual(
+                    render(documents[recipe.id]),
+                    render(RecipeDocumentSerializer(recipe).data),
+                )
+
+    def test_stored_documents(self):
+        documents = build_recipe_documents([r.id for r in self.recipes])
+        for request, user in (
+            (self.anonymous_request, None),
+            (self.request, self.reader),
+        ):
+            for recipe in self.get_recipes(user):
+                recipe.document = dump_document(documents[recipe.id])
+                if user is not None:
+                    recipe.is_favorited = True
+                    recipe.is_in_shopping_cart = False
+                with self.subTest(recipe=recipe.id, user=user):
+                    context = {'request': request}
+                    self.assertEqual(
+                        render(RecipeReadSerializer(
+                            recipe, context=context
+                        ).data),
+                        render(RecipeSerializerForTest(
+                            recipe, context=context
+                        ).data),
+                    )
+
+    def test_short_recipes(self):
+        queryset = Recipe.objects.order_by('pk')
+        rows = list(queryset.values(*SHORT_RECIPE_FIELDS))
+        for request in (None, self.request):
+            with self.subTest(request=request):
+                self.assertEqual(
+                    render(render_short_recipes(rows, request)),
+                    render(RecipeUserSerializer(
+                        queryset, many=True, context={'request': request}
+                    ).data),
+                )
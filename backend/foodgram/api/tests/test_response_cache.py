@@ -0,0 +1,42 @@
+from api.filters import RecipeFilter
+from api.response_cache import RECIPE_LIST_PARAMS
+
+from .base import BaseAPITestCase
+
+LIST_URL = '/api/recipes/'
+
+
+class AnonymousListCacheTests(BaseAPITestCase):
+    """Параметры, меняющие выдачу анониму, входят в ключ кеша"""
+
+    def setUp(self):
+        super().setUp()
+        author = self.create_user('author')
+        self.soup = self.create_recipe(author, name='Борщ', offset=0)
+        self.salad = self.create_recipe(author, name='Оливье', offset=10)
+
+    def get_ids(self, params=None):
+        response = self.client.get(LIST_URL, params or {})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_search(self):
+        self.assertEqual(len(self.get_ids()), 2)
+        self.assertEqual(self.get_ids({'search': 'Борщ'}), [self.soup.id])
+        self.assertEqual(self.get_ids({'search': 'Оливье'}), [self.salad.id])
+        self.assertEqual(len(self.get_ids()), 2)
+
+    def test_ingredients_and_max_missing(self):
+        ingredient = self.soup.ingredient_used.first().ingredient_id
+        self.assertEqual(
+            self.get_ids({'ingredients': ingredient}), [self.soup.id]
+        )
+        self.assertEqual(
+            self.get_ids({'ingredients': ingredient, 'max_missing': 0}), []
+        )
+        self.assertEqual(len(self.get_ids()), 2)
+
+    def test_every_filter_in_key(self):
+        self.assertLessEqual(
+            set(RecipeFilter.base_filters), set(RECIPE_LIST_PARAMS)
+        )
@@ -0,0 +1,84 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.models import ShoppingCart
+from recipes.shopping_list import find_mismatches
+
+from .base import BaseAPITestCase
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+
+
+class DownloadShoppingCartTests(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.user = self.create_user('buyer')
+        self.client.force_authenticate(self.user)
+
+    def fill_cart(self, recipes_count):
+        for number in range(recipes_count):
+            recipe = self.create_recipe(
+                self.author, ingredients_count=5, offset=number
+            )
+            response = self.client.post(
+                f'/api/recipes/{recipe.id}/shopping_cart/'
+            )
+            self.assertEqual(response.status_code, 201)
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        for recipes_count in (1, 30):
+            with self.subTest(recipes_count=recipes_count):
+                ShoppingCart.objects.filter(user=self.user).delete()
+                self.fill_cart(recipes_count)
+                with self.assertNumQueries(1):
+                    response = self.client.get(
+                        DOWNLOAD_URL, {'format': 'json'}
+                    )
+                self.assertEqual(response.status_code, 200)
+
+    def test_amounts_are_summed_by_ingredient(self):
+        self.fill_cart(2)
+        response = self.client.get(DOWNLOAD_URL, {'format': 'json'})
+        self.assertEqual(response.status_code, 200)
+        items = {item['name']: item['amount'] for item in response.json()}
+        # рецепты со сдвигом 0 и 1: общие ингредиенты 1-4
+        self.assertEqual(items['ингредиент 0'], 1)
+        self.assertEqual(items['ингредиент 1'], 2 + 1)
+        self.assertEqual(items['ингредиент 5'], 5)
+
+
+class BatchShoppingCartTests(BaseAPITestCase):
+    """Пакетные добавление и удаление не зависят от размера пачки"""
+
+    URL = '/api/recipes/shopping_cart/'
+
+    def setUp(self):
+        super().setUp()
+        author = self.create_user('author')
+        self.user = self.create_user('buyer')
+        self.client.force_authenticate(self.user)
+        self.recipe_ids = [
+            self.create_recipe(author, offset=number).id
+            for number in range(20)
+        ]
+
+    def count_queries(self, method, recipe_ids):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(
+                self.URL, {'recipes': recipe_ids}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        counts = {'post': set(), 'delete': set()}
+        for size in (1, 20):
+            recipe_ids = self.recipe_ids[:size]
+            for method in counts:
+                counts[method].add(self.count_queries(method, recipe_ids))
+            self.assertEqual(find_mismatches(), [])
+        self.assertEqual(len(counts['post']), 1, counts)
+        self.assertEqual(len(counts['delete']), 1, counts)
+        self.assertFalse(ShoppingCart.objects.exists())
+        self.assertFalse(self.user.shopping_list.exists())
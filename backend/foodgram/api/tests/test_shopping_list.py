@@ -0,0 +1,187 @@
+from recipes.models import IngredientRecipeAmount, Recipe, ShoppingCart
+from recipes.shopping_list import (find_mismatches, get_stored_shopping_lists,
+                                   rebuild_shopping_lists)
+from users.models import User
+
+from .base import BaseAPITestCase
+
+
+class ShoppingListAggregateTests(BaseAPITestCase):
+    """Агрегат ShoppingListItem совпадает с пересчетом при любом
+    пути записи"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.user = self.create_user('buyer')
+        self.recipes = [
+            self.create_recipe(self.author, offset=number)
+            for number in range(3)
+        ]
+        for recipe in self.recipes:
+            ShoppingCart.objects.create(
+                user=self.user, shopping_recipe=recipe
+            )
+            ShoppingCart.objects.create(
+                user=self.author, shopping_recipe=recipe
+            )
+
+    def test_model_create(self):
+        self.assertEqual(find_mismatches(), [])
+        self.assertTrue(self.user.shopping_list.exists())
+
+    def test_api_add_and_remove(self):
+        self.client.force_authenticate(self.user)
+        recipe = self.recipes[0]
+        url = f'/api/recipes/{recipe.id}/shopping_cart/'
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(find_mismatches(), [])
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(find_mismatches(), [])
+        response = self.client.delete(
+            '/api/recipes/shopping_cart/',
+            {'recipes': [recipe.id for recipe in self.recipes]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(find_mismatches(), [])
+        self.assertFalse(self.user.shopping_list.exists())
+
+    def test_shopping_cart_delete(self):
+        ShoppingCart.objects.filter(user=self.user).first().delete()
+        self.assertEqual(find_mismatches(), [])
+        ShoppingCart.objects.filter(user=self.user).delete()
+        self.assertEqual(find_mismatches(), [])
+
+    def test_recipe_delete(self):
+        self.recipes[1].delete()
+        self.assertEqual(find_mismatches(), [])
+        Recipe.objects.all().delete()
+        self.assertEqual(find_mismatches(), [])
+
+    def test_author_delete(self):
+        other = self.create_recipe(self.user, offset=10)
+        ShoppingCart.objects.create(user=self.author, shopping_recipe=other)
+        self.author.delete()
+        self.assertEqual(find_mismatches(), [])
+        self.assertFalse(self.user.shopping_list.exists())
+
+    def test_buyer_delete(self):
+        User.objects.filter(pk=self.user.pk).delete()
+        self.assertEqual(find_mismatches(), [])
+
+    def test_rebuild_for_user(self):
+        # каждый рецепт в корзинах двух пользователей
+        expected = get_stored_shopping_lists([self.user.id])
+        self.assertEqual(find_mismatches([self.user.id]), [])
+        rebuild_shopping_lists([self.user.id])
+        self.assertEqual(
+            get_stored_shopping_lists([self.user.id]), expected
+        )
+        self.assertEqual(find_mismatches(), [])
+
+
+class ShoppingListAdminTests(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com',
+            password='password-12345',
+        )
+        self.client.force_login(self.admin)
+        self.recipe = self.create_recipe(self.admin, ingredients_count=2)
+        ShoppingCart.objects.create(
+            user=self.admin, shopping_recipe=self.recipe
+        )
+
+    def test_inline_change(self):
+        rows = list(self.recipe.ingredient_used.order_by('pk'))
+        data = {
+            'name': self.recipe.name,
+            'author': self.admin.pk,
+            'text': self.recipe.text,
+            'cooking_time': self.recipe.cooking_time,
+            'tags': [tag.pk for tag in self.tags[:2]],
+            'ingredient_used-TOTAL_FORMS': 3,
+            'ingredient_used-INITIAL_FORMS': 2,
+            'ingredient_used-0-id': rows[0].pk,
+            'ingredient_used-0-recipe': self.recipe.pk,
+            'ingredient_used-0-ingredient': rows[0].ingredient_id,
+            'ingredient_used-0-amount': 10,
+            'ingredient_used-1-id': rows[1].pk,
+            'ingredient_used-1-recipe': self.recipe.pk,
+            'ingredient_used-1-ingredient': rows[1].ingredient_id,
+            'ingredient_used-1-amount': rows[1].amount,
+            'ingredient_used-1-DELETE': 'on',
+            'ingredient_used-2-recipe': self.recipe.pk,
+            'ingredient_used-2-ingredient': self.ingredients[30].pk,
+            'ingredient_used-2-amount': 7,
+        }
+        response = self.client.post(
+            f'/admin/recipes/recipe/{self.recipe.pk}/change/', data
+        )
+        self.assertEqual(response.status_code, 302, response.content[:3000])
+        self.assertEqual(self.recipe.ingredient_used.count(), 2)
+        self.assertEqual(find_mismatches(), [])
+
+    def test_ingredient_row_change_and_delete(self):
+        row = self.recipe.ingredient_used.first()
+        response = self.client.post(
+            f'/admin/recipes/ingredientrecipeamount/{row.pk}/change/',
+            {
+                'recipe': self.recipe.pk,
+                'ingredient': self.ingredients[20].pk,
+                'amount': 50,
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(find_mismatches(), [])
+        response = self.client.post(
+            f'/admin/recipes/ingredientrecipeamount/{row.pk}/delete/',
+            {'post': 'yes'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(
+            IngredientRecipeAmount.objects.filter(pk=row.pk).exists()
+        )
+        self.assertEqual(find_mismatches(), [])
+
+    def assert_ingredients_count(self, count):
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.ingredients_count, count)
+        self.assertEqual(self.recipe.ingredient_used.count(), count)
+        self.assertEqual(find_mismatches(), [])
+
+    def test_ingredient_rows_update_ingredients_count(self):
+        url = '/admin/recipes/ingredientrecipeamount/'
+        for number in (20, 21):
+            response = self.client.post(f'{url}add/', {
+                'recipe': self.recipe.pk,
+                'ingredient': self.ingredients[number].pk,
+                'amount': 5,
+            })
+            self.assertEqual(response.status_code, 302)
+        self.assert_ingredients_count(4)
+        row = self.recipe.ingredient_used.first()
+        response = self.client.post(f'{url}{row.pk}/delete/', {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assert_ingredients_count(3)
+        response = self.client.post(url, {
+            'action': 'delete_selected',
+            'post': 'yes',
+            '_selected_action': list(
+                self.recipe.ingredient_used.values_list('pk', flat=True)[:2]
+            ),
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assert_ingredients_count(1)
+
+    def test_shopping_cart_admin_delete(self):
+        cart = ShoppingCart.objects.get(user=self.admin)
+        response = self.client.post(
+            f'/admin/recipes/shoppingcart/{cart.pk}/delete/', {'post': 'yes'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(find_mismatches(), [])
+        self.assertFalse(self.admin.shopping_list.exists())
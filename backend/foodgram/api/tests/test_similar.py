@@ -0,0 +1,74 @@
+from unittest import mock
+
+from recipes import similarity
+from recipes.models import IngredientRecipeAmount, SimilarRecipe
+
+from .base import BaseAPITestCase
+
+MAX_DOCUMENT_FREQUENCY = 3
+
+
+@mock.patch(
+    'recipes.similarity.SIMILAR_MAX_DOCUMENT_FREQUENCY', MAX_DOCUMENT_FREQUENCY
+)
+class SimilarRecipesTests(BaseAPITestCase):
+    """Частый ингредиент не порождает кандидатов в похожие"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.common = self.ingredients[39]
+        # соседние рецепты делят один редкий ингредиент, все — частый
+        self.recipes = [
+            self.create_recipe(self.author, offset=number * 2)
+            for number in range(10)
+        ]
+        for recipe in self.recipes:
+            self.add_common(recipe)
+
+    def add_common(self, recipe):
+        IngredientRecipeAmount.objects.create(
+            recipe=recipe, ingredient=self.common, amount=1
+        )
+
+    def get_neighbours(self, recipe):
+        return set(
+            SimilarRecipe.objects.filter(recipe=recipe)
+            .values_list('similar_id', flat=True)
+        )
+
+    def test_build_skips_common_ingredient(self):
+        with mock.patch(
+            'recipes.similarity.similarity', wraps=similarity.similarity
+        ) as compare:
+            similarity.build_similar_recipes()
+        self.assertEqual(compare.call_count, 2 * (len(self.recipes) - 1))
+        self.assertEqual(
+            self.get_neighbours(self.recipes[4]),
+            {self.recipes[3].id, self.recipes[5].id},
+        )
+        response = self.client.get(
+            f'/api/recipes/{self.recipes[0].id}/similar/'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()],
+            [self.recipes[1].id],
+        )
+
+    def test_refresh_matches_build(self):
+        similarity.build_similar_recipes()
+        expected = self.get_neighbours(self.recipes[4])
+        SimilarRecipe.objects.filter(recipe=self.recipes[4]).delete()
+        similarity.refresh_recipe(self.recipes[4].id)
+        self.assertEqual(self.get_neighbours(self.recipes[4]), expected)
+
+    def test_only_common_ingredients(self):
+        recipe = self.create_recipe(self.author, ingredients_count=0)
+        self.add_common(recipe)
+        similarity.build_similar_recipes()
+        built = self.get_neighbours(recipe)
+        # последние рецепты с частым ингредиентом, сам рецепт среди них
+        self.assertEqual(len(built), MAX_DOCUMENT_FREQUENCY - 1)
+        similarity.refresh_recipe(recipe.id)
+        self.assertEqual(self.get_neighbours(recipe), built)
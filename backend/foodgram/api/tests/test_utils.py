@@ -0,0 +1,51 @@
+from api.utils import get_limit_param, get_not_modified
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+factory = APIRequestFactory()
+
+
+def make_request(**kwargs):
+    return Request(factory.get('/', **kwargs))
+
+
+class NotModifiedTests(SimpleTestCase):
+
+    def test_matching_etag(self):
+        for if_none_match in ('"v1"', 'W/"v1"', '"v0", "v1"', '*'):
+            with self.subTest(if_none_match=if_none_match):
+                response = get_not_modified(
+                    make_request(HTTP_IF_NONE_MATCH=if_none_match), '"v1"'
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], '"v1"')
+
+    def test_other_etag(self):
+        for headers in ({}, {'HTTP_IF_NONE_MATCH': '"v0"'}):
+            with self.subTest(headers=headers):
+                self.assertIsNone(
+                    get_not_modified(make_request(**headers), '"v1"')
+                )
+
+
+class LimitParamTests(SimpleTestCase):
+
+    def limit(self, value, minimum=0):
+        params = {} if value is None else {'limit': value}
+        return get_limit_param(
+            make_request(data=params), 'limit', 5, 10, minimum
+        )
+
+    def test_values(self):
+        for value, expected in ((None, 5), ('', 5), ('0', 0), ('7', 7),
+                                ('50', 10)):
+            with self.subTest(value=value):
+                self.assertEqual(self.limit(value), expected)
+
+    def test_invalid(self):
+        for value, minimum in (('-1', 0), ('x', 0), ('0', 1)):
+            with self.subTest(value=value, minimum=minimum):
+                with self.assertRaises(ValidationError):
+                    self.limit(value, minimum)
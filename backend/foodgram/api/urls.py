@@ -1,8 +1,9 @@
 from api.views import (FavoriteRecipeView, IngredientViewSet, RecipeViewSet,
                        ShoppingCartCreateView, SubscriptionsCreateView,
-                       SubscriptionsReadView, TagViewSet)
+                       SubscriptionsReadView, TagViewSet, TokenCacheStatsView,
+                       UserViewSet)
 from django.urls import include, path
-from rest_framework.routers import DefaultRouter
+from rest_framework.routers import DefaultRouter, SimpleRouter
 
 app_name = 'api'
 
@@ -11,8 +12,23 @@ router.register(r'recipes', RecipeViewSet, basename='recipes')
 router.register(r'ingredients', IngredientViewSet, basename='ingredients')
 router.register(r'tags', TagViewSet, basename='tags')
 
+users_router = SimpleRouter()
+users_router.register(r'users', UserViewSet, basename='users')
+
 
 urlpatterns = [
+    path(
+        'recipes/favorite/',
+        FavoriteRecipeView.as_view(
+            actions={'post': 'create_many', 'delete': 'destroy_many'}
+        ),
+    ),
+    path(
+        'recipes/shopping_cart/',
+        ShoppingCartCreateView.as_view(
+            actions={'post': 'create_many', 'delete': 'destroy_many'}
+        ),
+    ),
     path('', include(router.urls)),
     path(
         'recipes/<int:recipe_id>/shopping_cart/',
@@ -30,7 +46,8 @@ urlpatterns = [
             actions={'post': 'create', 'delete': 'destroy'}
         ),
     ),
-    path('', include('djoser.urls')),
+    path('', include(users_router.urls)),
+    path('auth/token/stats/', TokenCacheStatsView.as_view()),
     path('auth/', include('djoser.urls.authtoken')),
     path(
         'recipes/<int:recipe_id>/favorite/',
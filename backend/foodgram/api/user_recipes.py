@@ -0,0 +1,56 @@
+"""Множества id рецептов в избранном и в списке покупок пользователя.
+
+Хранятся в общем кеше под версией, которую сбрасывают записи
+FavoriteRecipeView и ShoppingCartCreateView. Флаги рецептов и фильтры
+списка проверяют вхождение в множество вместо подзапросов к базе.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from recipes.models import FavoriteRecipe, ShoppingCart
+
+from .response_cache import get_version
+
+USER_RECIPES_CACHE_TIMEOUT = 60 * 60
+FAVORITES = 'favorites'
+SHOPPING_CART = 'shopping_cart'
+
+
+def user_recipes_version_key(kind, user_id):
+    return f'user_recipes:{kind}:version:{user_id}'
+
+
+def load_recipe_ids(kind, user_id):
+    if kind == FAVORITES:
+        queryset = FavoriteRecipe.objects.filter(user_id=user_id).values_list(
+            'recipe_id', flat=True
+        )
+    else:
+        queryset = ShoppingCart.objects.filter(user_id=user_id).values_list(
+            'shopping_recipe_id', flat=True
+        )
+    return frozenset(queryset)
+
+
+def get_recipe_ids(kind, user_id):
+    """Множество id рецептов пользователя из кеша или из базы."""
+    version = get_version(user_recipes_version_key(kind, user_id))
+    cache_key = f'user_recipes:{kind}:{user_id}:{version}'
+    recipe_ids = cache.get(cache_key)
+    if recipe_ids is None:
+        recipe_ids = load_recipe_ids(kind, user_id)
+        cache.set(cache_key, recipe_ids, USER_RECIPES_CACHE_TIMEOUT)
+    return recipe_ids
+
+
+def get_favorite_ids(user_id):
+    return get_recipe_ids(FAVORITES, user_id)
+
+
+def get_shopping_cart_ids(user_id):
+    return get_recipe_ids(SHOPPING_CART, user_id)
+
+
+def invalidate_recipe_ids(kind, user_id):
+    """Сбрасывает множество пользователя после фиксации транзакции."""
+    version_key = user_recipes_version_key(kind, user_id)
+    transaction.on_commit(lambda: cache.delete(version_key))
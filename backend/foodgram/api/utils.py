@@ -0,0 +1,38 @@
+"""Общие помощники представлений api."""
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.exceptions import ValidationError
+
+
+def get_not_modified(request, etag):
+    """Ответ 304 с заголовком ETag, если If-None-Match запроса совпадает
+    с etag (строка в кавычках), иначе None. Сравнение слабое, как
+    требует RFC 9110: W/ перед тегом не мешает совпадению."""
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return None
+    if if_none_match != '*' and etag not in {
+        tag.removeprefix('W/') for tag in parse_etags(if_none_match)
+    }:
+        return None
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    return response
+
+
+def get_limit_param(request, name, default, maximum, minimum=0):
+    """Целый параметр запроса name от minimum, урезанный до maximum;
+    default, если параметр не передан."""
+    value = request.query_params.get(name)
+    if not value:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        value = minimum - 1
+    if value < minimum:
+        raise ValidationError({
+            name: 'Ожидается целое положительное число' if minimum > 0
+            else 'Ожидается целое неотрицательное число'
+        })
+    return min(value, maximum)
@@ -1,69 +1,142 @@
+import hashlib
+
 from api.serializers import (FavoriteRecipeSerializer, IngredientSerializer,
-                             RecipeCreateUpdateSerializer,
+                             RecipeCreateUpdateSerializer, RecipeIdsSerializer,
                              RecipeReadSerializer, ShoppingCartSerializer,
                              SubscriptionCreateSerializer,
                              SubscriptionReadSerializer, TagSerializer)
-from django.db.models import Exists, OuterRef
-from django.http import FileResponse
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.http import quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
-from recipes.models import (FavoriteRecipe, Ingredient, IngredientRecipeAmount,
-                            Recipe, ShoppingCart, Tag)
+from djoser.views import UserViewSet as DjoserUserViewSet
+from recipes import feed, shopping_list
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe, ShoppingCart,
+                            ShoppingListItem, Tag)
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import (AllowAny, IsAuthenticated,
+from rest_framework.permissions import (AllowAny, IsAdminUser, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 from users.models import Subscription, User
 
-from .filters import RecipeFilter
-from .mixins import CreateDestroyView
+from .authentication import get_token_stats
+from .filters import IngredientFilter, RecipeFilter
+from .ingredient_index import (INGREDIENT_SEARCH_LIMIT,
+                               INGREDIENT_SEARCH_LIMIT_MAX, search_ingredients)
+from .mixins import CreateDestroyView, ReferenceListMixin
+from .pagination import CursorOptionalPagination
 from .permissions import IsAuthorOrReadOnly
+from .renderers import (ShoppingCartCSVRenderer, ShoppingCartJSONRenderer,
+                        ShoppingCartPDFRenderer, ShoppingCartTextRenderer)
+from .representations import (SHORT_RECIPE_FIELDS, build_recipe_documents,
+                              dump_document, fetch_latest_recipes,
+                              render_short_recipes)
+from .response_cache import (RECIPES_CACHE_TIMEOUT, recipe_detail_cache_key,
+                             recipe_list_cache_key)
+from .user_recipes import (FAVORITES, SHOPPING_CART, get_favorite_ids,
+                           get_shopping_cart_ids, invalidate_recipe_ids)
+from .utils import get_limit_param, get_not_modified
+
+SHOPPING_CART_CACHE_TIMEOUT = 60 * 60 * 24
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ReferenceListMixin, viewsets.ReadOnlyModelViewSet):
     """Представление для ингредиента чтение"""
 
+    reference_name = 'ingredients'
+
     queryset = Ingredient.objects.all()
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
+    filterset_class = IngredientFilter
     serializer_class = IngredientSerializer
     search_fields = ['^name']
     pagination_class = None
     permission_classes = [AllowAny]
 
+    def get_search_limit(self):
+        """limit: целое от 1, не больше INGREDIENT_SEARCH_LIMIT_MAX."""
+        return get_limit_param(
+            self.request, 'limit', INGREDIENT_SEARCH_LIMIT,
+            INGREDIENT_SEARCH_LIMIT_MAX, minimum=1,
+        )
+
+    def list(self, request, *args, **kwargs):
+        """Поиск по началу имени обслуживается индексом в памяти,
+        поиск по похожести (search) — базой, с ограничением limit."""
+        name = request.query_params.get(api_settings.SEARCH_PARAM, '')
+        if name.strip():
+            return Response(
+                search_ingredients(name, self.get_search_limit())
+            )
+        if request.query_params.get('search', '').strip():
+            queryset = self.filter_queryset(self.get_queryset())
+            serializer = self.get_serializer(
+                queryset[:self.get_search_limit()], many=True
+            )
+            return Response(serializer.data)
+        return super().list(request, *args, **kwargs)
+
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ReferenceListMixin, viewsets.ReadOnlyModelViewSet):
     """Представление для тэга чтение"""
 
+    reference_name = 'tags'
+
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
     permission_classes = [AllowAny]
 
 
-def create_shopping_cart(user):
-    shopping_cart_items = ShoppingCart.objects.filter(
-        user=user).select_related('shopping_recipe')
+def annotate_is_subscribed(queryset, user):
+    """Аннотирует пользователей флагом is_subscribed
+    одним подзапросом Exists."""
+    if not user.is_authenticated:
+        return queryset
+    return queryset.annotate(
+        is_subscribed=Exists(
+            Subscription.objects.filter(subscriber=user, author=OuterRef('pk'))
+        )
+    )
 
-    shopping_cart = {}
 
-    for item in shopping_cart_items:
-        recipe = item.shopping_recipe
-        ingredient_amounts = IngredientRecipeAmount.objects.filter(
-            recipe=recipe
+def get_shopping_cart_version(shopping_cart):
+    """Версия списка покупок — хеш его содержимого."""
+    digest = hashlib.sha256()
+    for item in shopping_cart:
+        digest.update(
+            f"{item['name']}\0{item['unit']}\0{item['total']}\n".encode()
         )
+    return digest.hexdigest()
 
-        for ingrefient_amount in ingredient_amounts:
-            ingredient = ingrefient_amount.ingredient
-            name = ingredient.name
-            amount = ingrefient_amount.amount
-            unit = ingredient.measurement_unit
 
-            if name in shopping_cart:
-                shopping_cart[name]['amount'] += amount
-            else:
-                shopping_cart[name] = {'amount': amount, 'unit': unit}
-    return shopping_cart
+def create_shopping_cart(user):
+    """Список покупок пользователя из агрегата ShoppingListItem:
+    одно чтение по индексу (user, ingredient)."""
+    return (
+        ShoppingListItem.objects.filter(user=user)
+        .values(
+            name=F('ingredient__name'),
+            unit=F('ingredient__measurement_unit'),
+            total=F('amount'),
+        )
+        .order_by('name', 'unit')
+    )
+
+
+class UserViewSet(DjoserUserViewSet):
+    """Пользователи djoser с флагом подписки из аннотации"""
+
+    def get_queryset(self):
+        return annotate_is_subscribed(
+            super().get_queryset().order_by('id'), self.request.user
+        )
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -71,27 +144,112 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     filter_backends = [filters.OrderingFilter, DjangoFilterBackend]
     ordering_fields = ['-created_at']
+    ordering = ('-created_at', '-id')
+    pagination_class = CursorOptionalPagination
     filterset_class = RecipeFilter
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
 
-    @action(detail=False)
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        renderer_classes=[
+            ShoppingCartTextRenderer,
+            ShoppingCartCSVRenderer,
+            ShoppingCartJSONRenderer,
+            ShoppingCartPDFRenderer,
+        ],
+    )
     def download_shopping_cart(self, request):
-        """Скачиваем список покупок"""
-        user = request.user
-        shopping_cart = create_shopping_cart(user)
-
-        with open('shopping_cart.txt', 'w') as file:
-            for name, data in shopping_cart.items():
-                line = f"{name} ({data['unit']}) — {data['amount']}\n"
-                file.write(line)
-        response = FileResponse(
-            open('shopping_cart.txt', 'rb'), as_attachment=True
+        """Скачиваем список покупок.
+
+        Формат выбирается параметром format или заголовком Accept.
+        ETag вычисляется по содержимому списка, готовый файл кешируется
+        для пользователя и версии списка.
+        """
+        renderer = request.accepted_renderer
+        shopping_cart = list(create_shopping_cart(request.user))
+        version = get_shopping_cart_version(shopping_cart)
+        etag = quote_etag(f'{version}-{renderer.format}')
+        response = get_not_modified(request, etag)
+        if response is not None:
+            return response
+        cache_key = (
+            f'shopping_cart:{request.user.id}:{version}:{renderer.format}'
         )
-        response[
-            'Content-Disposition'
-        ] = 'attachment; filename=shopping_cart.txt'
+        content = cache.get(cache_key)
+        if content is None:
+            content = renderer.render(shopping_cart)
+            cache.set(cache_key, content, SHOPPING_CART_CACHE_TIMEOUT)
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
+        response['Content-Disposition'] = (
+            f'attachment; filename=shopping_cart.{renderer.format}'
+        )
+        return response
+
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь"""
+        queryset = feed.filter_feed(self.get_queryset(), request.user)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        recipes = list(queryset)
+        self.prefetch_for_representation(recipes)
+        serializer = self.get_serializer(recipes, many=True)
+        return Response(serializer.data)
+
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        """Похожие рецепты из заранее посчитанных соседей
+        одним запросом по индексу (recipe, score)"""
+        if not pk.isdigit():
+            raise Http404
+        rows = list(
+            Recipe.objects.filter(similar_to__recipe_id=pk)
+            .order_by('-similar_to__score', '-id')
+            .values(*SHORT_RECIPE_FIELDS)
+        )
+        if not rows:
+            get_object_or_404(Recipe.objects.only('pk'), pk=pk)
+        return Response(render_short_recipes(rows, request))
+
+    def get_cached_response(self, cache_key, handler, *args, **kwargs):
+        """Ответ анонимному пользователю из кеша или через handler."""
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+        response = handler(*args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(cache_key, response.data, RECIPES_CACHE_TIMEOUT)
         return response
 
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        return self.get_cached_response(
+            recipe_list_cache_key(request),
+            super().list,
+            request,
+            *args,
+            **kwargs,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().retrieve(request, *args, **kwargs)
+        return self.get_cached_response(
+            recipe_detail_cache_key(request, kwargs['pk']),
+            super().retrieve,
+            request,
+            *args,
+            **kwargs,
+        )
+
     def get_serializer_class(self):
         if self.request.method in ['POST', 'PATCH', 'DELETE']:
             return RecipeCreateUpdateSerializer
@@ -100,26 +258,47 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        queryset = Recipe.objects
+        queryset = Recipe.objects.defer('search_vector')
 
         if user.is_authenticated:
             queryset = queryset.annotate(
-                is_in_shopping_cart=Exists(
-                    ShoppingCart.objects.filter(
-                        user=user, shopping_recipe=OuterRef('id')
-                    )
-                ),
-                is_favorited=Exists(
-                    FavoriteRecipe.objects.filter(
-                        user=user, recipe=OuterRef('id')
+                author_is_subscribed=Exists(
+                    Subscription.objects.filter(
+                        subscriber=user, author=OuterRef('author')
                     )
                 ),
             )
-        return (
-            queryset.select_related('author')
-            .prefetch_related('ingredients')
-            .order_by('-created_at')
-        )
+        return queryset.order_by(*self.ordering)
+
+    def prefetch_for_representation(self, recipes):
+        """Рецептам без сохраненного документа документ собирается
+        быстрым путем, одним набором запросов на всю страницу.
+        Флаги пользователя берутся из кешированных множеств id."""
+        user = self.request.user
+        if user.is_authenticated:
+            favorite_ids = get_favorite_ids(user.id)
+            shopping_cart_ids = get_shopping_cart_ids(user.id)
+            for recipe in recipes:
+                recipe.is_favorited = recipe.id in favorite_ids
+                recipe.is_in_shopping_cart = recipe.id in shopping_cart_ids
+        recipes = [recipe for recipe in recipes if not recipe.document]
+        if not recipes:
+            return
+        documents = build_recipe_documents([recipe.id for recipe in recipes])
+        for recipe in recipes:
+            recipe.document = dump_document(documents[recipe.id])
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.prefetch_for_representation(page)
+        return page
+
+    def get_object(self):
+        instance = super().get_object()
+        if self.request.method == 'GET':
+            self.prefetch_for_representation([instance])
+        return instance
 
 
 class BaseRecipeActionView(CreateDestroyView):
@@ -130,30 +309,89 @@ class BaseRecipeActionView(CreateDestroyView):
             "Метод get_lookup_field должен быть переопределен"
         )
 
+    def get_not_found_error(self):
+        return {
+            'error': f'Рецепта нет в {self.queryset.model._meta.verbose_name}'
+        }
+
+    def get_batch_recipe_ids(self):
+        """Уникальные id рецептов из тела пакетного запроса."""
+        serializer = RecipeIdsSerializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        return list(dict.fromkeys(serializer.validated_data['recipes']))
+
     def destroy(self, request, *args, **kwargs):
         user = self.request.user
         recipe_id = self.kwargs['recipe_id']
 
-        try:
-            recipe_item = self.queryset.get(
-                **{self.get_lookup_field(): recipe_id, 'user': user}
-            )
-            recipe_item.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        except self.queryset.model.DoesNotExist:
+        deleted, _ = self.queryset.filter(
+            **{self.get_lookup_field(): recipe_id, 'user': user}
+        ).delete()
+        if not deleted:
             return Response(
-                {
-                    'error':
-                    f'Рецепта нет в {self.queryset.model._meta.verbose_name}'
-                },
+                self.get_not_found_error(),
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        invalidate_recipe_ids(self.user_recipes_kind, user.id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def create_many(self, request, *args, **kwargs):
+        """Добавляет рецепты из списка recipes, результат по каждому."""
+        serializer = self.get_serializer()
+        results = []
+        for recipe_id, item in serializer.create_many(
+            self.get_batch_recipe_ids()
+        ):
+            if isinstance(item, dict):
+                results.append({
+                    'id': recipe_id,
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': item,
+                })
+            else:
+                results.append({
+                    'id': recipe_id,
+                    'status': status.HTTP_201_CREATED,
+                    'data': self.get_serializer(item).data,
+                })
+        return Response(results)
+
+    def delete_items(self, user, items):
+        """Удаляет строки {recipe_id: pk} пакетного запроса."""
+        self.queryset.filter(pk__in=items.values()).delete()
+
+    def destroy_many(self, request, *args, **kwargs):
+        """Удаляет рецепты из списка recipes одним запросом DELETE,
+        результат по каждому."""
+        user = self.request.user
+        recipe_ids = self.get_batch_recipe_ids()
+        lookup_field = self.get_lookup_field()
+        with transaction.atomic():
+            items = dict(
+                self.queryset.select_for_update()
+                .filter(user=user, **{f'{lookup_field}__in': recipe_ids})
+                .values_list(lookup_field, 'pk')
+            )
+            if items:
+                self.delete_items(user, items)
+        if items:
+            invalidate_recipe_ids(self.user_recipes_kind, user.id)
+        return Response([
+            {'id': recipe_id, 'status': status.HTTP_204_NO_CONTENT}
+            if recipe_id in items else {
+                'id': recipe_id,
+                'status': status.HTTP_400_BAD_REQUEST,
+                'errors': self.get_not_found_error(),
+            }
+            for recipe_id in recipe_ids
+        ])
 
 
 class FavoriteRecipeView(BaseRecipeActionView):
     """Представление для Избранного."""
 
     lookup_field = 'recipe_id'
+    user_recipes_kind = FAVORITES
 
     def get_lookup_field(self):
         return self.lookup_field
@@ -167,6 +405,7 @@ class ShoppingCartCreateView(BaseRecipeActionView):
     """Добавления/удаления рецепта из Списка покупок."""
 
     lookup_field = 'shopping_recipe_id'
+    user_recipes_kind = SHOPPING_CART
 
     def get_lookup_field(self):
         return self.lookup_field
@@ -174,21 +413,54 @@ class ShoppingCartCreateView(BaseRecipeActionView):
     queryset = ShoppingCart.objects.all()
     serializer_class = ShoppingCartSerializer
 
+    def delete_items(self, user, items):
+        """Одна дельта агрегата на всю пачку и один DELETE: обычный
+        delete() вызвал бы pre_delete и пересчет на каждую строку."""
+        shopping_list.remove_recipes(user.id, list(items))
+        queryset = self.queryset.filter(pk__in=items.values())
+        queryset._raw_delete(queryset.db)
+
 
 class SubscriptionsReadView(viewsets.ReadOnlyModelViewSet):
     """Представление просмотр подсписок"""
 
     serializer_class = SubscriptionReadSerializer
+    ordering = ('id',)
+    pagination_class = CursorOptionalPagination
+
+    recipes_limit_max = 100
+
+    def get_recipes_limit(self):
+        """recipes_limit: целое от 0, не больше recipes_limit_max."""
+        return get_limit_param(
+            self.request, 'recipes_limit', self.recipes_limit_max,
+            self.recipes_limit_max,
+        )
 
     def get_queryset(self):
         user = self.request.user
         queryset = (
             Subscription.objects.filter(subscriber=user)
             .select_related('author')
-            .order_by('pk')
+            .annotate(recipes_count=Count('author__recipes'))
+            .order_by(*self.ordering)
         )
         return queryset
 
+    def paginate_queryset(self, queryset):
+        recipes_limit = self.get_recipes_limit()
+        page = super().paginate_queryset(queryset)
+        self.author_recipes = fetch_latest_recipes(
+            [subscription.author_id for subscription in page],
+            recipes_limit,
+        )
+        return page
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['author_recipes'] = getattr(self, 'author_recipes', {})
+        return context
+
 
 class SubscriptionsCreateView(CreateDestroyView):
     """Представление для Подписки/Отписки на пользователя"""
@@ -205,10 +477,21 @@ class SubscriptionsCreateView(CreateDestroyView):
             subscription = Subscription.objects.get(
                 subscriber=subscriber, author=author
             )
-            subscription.delete()
+            with transaction.atomic():
+                feed.trim_subscription(subscriber.id, author.id)
+                subscription.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Subscription.DoesNotExist:
             return Response(
                 {'error': 'Вы не были подписаны на этого автора'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+
+
+class TokenCacheStatsView(APIView):
+    """Счетчики кеша токенов текущего процесса"""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_token_stats())
@@ -1,7 +1,11 @@
 from django.contrib import admin
 
+from . import shopping_list
+from .cookable import update_ingredients_counts
 from .models import (FavoriteRecipe, Ingredient, IngredientRecipeAmount,
                      Recipe, ShoppingCart, Tag)
+from .signals import recipes_changed
+from .similarity import refresh_recipe
 
 
 class IngredientInline(admin.TabularInline):
@@ -19,6 +23,19 @@ class RecipeAdmin(admin.ModelAdmin):
 
     recipe_in_favoriterecipe.admin_order_field = 'recipe_in_favoriterecipe'
 
+    def save_related(self, request, form, formsets, change):
+        recipe_id = form.instance.id
+        old_amounts = (
+            shopping_list.get_recipe_amounts(recipe_id) if change else {}
+        )
+        super().save_related(request, form, formsets, change)
+        shopping_list.change_recipe(
+            recipe_id, old_amounts, shopping_list.get_recipe_amounts(recipe_id)
+        )
+        update_ingredients_counts([form.instance.id])
+        recipes_changed.send(sender=Recipe, recipe_ids=[recipe_id])
+        refresh_recipe(form.instance.id)
+
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
@@ -43,4 +60,45 @@ class ShoppingCartAdmin(admin.ModelAdmin):
 
 @admin.register(IngredientRecipeAmount)
 class IngredientRecipeAmountAdmin(admin.ModelAdmin):
-    pass
+    """Правка строк ингредиентов переносится в списки покупок,
+    число ингредиентов и документы рецептов"""
+
+    def ingredients_changed(self, recipe_ids):
+        recipe_ids = list(recipe_ids)
+        update_ingredients_counts(recipe_ids)
+        recipes_changed.send(sender=Recipe, recipe_ids=recipe_ids)
+
+    def save_model(self, request, obj, form, change):
+        old = (
+            IngredientRecipeAmount.objects.filter(pk=obj.pk).first()
+            if change else None
+        )
+        super().save_model(request, obj, form, change)
+        recipe_ids = {obj.recipe_id}
+        if old is not None:
+            shopping_list.change_recipe(
+                old.recipe_id, {old.ingredient_id: old.amount}, {}
+            )
+            recipe_ids.add(old.recipe_id)
+        shopping_list.change_recipe(
+            obj.recipe_id, {}, {obj.ingredient_id: obj.amount}
+        )
+        self.ingredients_changed(recipe_ids)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        shopping_list.change_recipe(
+            obj.recipe_id, {obj.ingredient_id: obj.amount}, {}
+        )
+        self.ingredients_changed([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        rows = list(
+            queryset.values_list('recipe_id', 'ingredient_id', 'amount')
+        )
+        super().delete_queryset(request, queryset)
+        for recipe_id, ingredient_id, amount in rows:
+            shopping_list.change_recipe(
+                recipe_id, {ingredient_id: amount}, {}
+            )
+        self.ingredients_changed({recipe_id for recipe_id, _, _ in rows})
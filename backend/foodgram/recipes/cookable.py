@@ -0,0 +1,100 @@
+"""Подбор рецептов по имеющимся ингредиентам.
+
+Обратный индекс ингредиент -> рецепты — индекс (ingredient, recipe)
+таблицы IngredientRecipeAmount, число ингредиентов рецепта хранится
+в Recipe.ingredients_count. Кандидаты берутся только из списков
+рецептов переданных ингредиентов: группировка по индексу
+(ingredient, recipe) отбирает не больше COOKABLE_CANDIDATES_LIMIT
+рецептов с наибольшей долей имеющихся ингредиентов, и только для них
+считаются аннотации и сортировка. Поэтому один частый ингредиент
+(соль, вода) не превращает запрос в сортировку всего каталога,
+а выдача обрывается после COOKABLE_CANDIDATES_LIMIT рецептов.
+"""
+from django.db.models import (Count, F, FloatField, IntegerField, OuterRef,
+                              Subquery)
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from .models import IngredientRecipeAmount, Recipe
+
+COOKABLE_MAX_INGREDIENTS = 100
+COOKABLE_CANDIDATES_LIMIT = 1000
+
+
+def update_ingredients_counts(recipe_ids):
+    """Пересчитывает Recipe.ingredients_count указанных рецептов."""
+    Recipe.objects.filter(pk__in=list(recipe_ids)).update(
+        ingredients_count=Coalesce(
+            Subquery(
+                IngredientRecipeAmount.objects.filter(recipe=OuterRef('pk'))
+                .order_by().values('recipe').annotate(count=Count('pk'))
+                .values('count'),
+                output_field=IntegerField(),
+            ),
+            0,
+        )
+    )
+
+
+def coverage(matched, ingredients_count):
+    return Cast(matched, FloatField()) / NullIf(ingredients_count, 0)
+
+
+def get_candidate_ids(queryset, ingredient_ids, max_missing=None):
+    """Подзапрос id не более COOKABLE_CANDIDATES_LIMIT рецептов
+    из queryset с наибольшей долей ingredient_ids."""
+    candidates = (
+        IngredientRecipeAmount.objects.filter(
+            ingredient_id__in=ingredient_ids,
+            recipe__in=queryset.values('pk'),
+        )
+        .values('recipe_id')
+        .annotate(
+            matched=Count('pk'),
+            coverage=coverage(Count('pk'), F('recipe__ingredients_count')),
+        )
+    )
+    if max_missing is not None:
+        candidates = candidates.filter(
+            matched__gte=F('recipe__ingredients_count') - max_missing
+        )
+    return candidates.order_by(
+        F('coverage').desc(nulls_last=True),
+        '-matched',
+        '-recipe__created_at',
+        '-recipe_id',
+    ).values('recipe_id')[:COOKABLE_CANDIDATES_LIMIT]
+
+
+def filter_cookable(queryset, ingredient_ids, max_missing=None):
+    """Рецепты, в которых есть хотя бы один из ingredient_ids
+    и не хватает не больше max_missing ингредиентов, по убыванию
+    доли имеющихся ингредиентов (аннотации ingredients_matched,
+    ingredients_missing, ingredients_coverage); не больше
+    COOKABLE_CANDIDATES_LIMIT рецептов."""
+    ingredient_ids = list(ingredient_ids)
+    matched = (
+        IngredientRecipeAmount.objects.filter(
+            recipe=OuterRef('pk'), ingredient_id__in=ingredient_ids
+        )
+        .order_by().values('recipe').annotate(count=Count('pk'))
+        .values('count')
+    )
+    queryset = queryset.filter(
+        pk__in=get_candidate_ids(queryset, ingredient_ids, max_missing)
+    ).annotate(
+        ingredients_matched=Subquery(matched, output_field=IntegerField()),
+        ingredients_missing=(
+            F('ingredients_count') - F('ingredients_matched')
+        ),
+        ingredients_coverage=coverage(
+            'ingredients_matched', 'ingredients_count'
+        ),
+    )
+    if max_missing is not None:
+        queryset = queryset.filter(ingredients_missing__lte=max_missing)
+    return queryset.order_by(
+        F('ingredients_coverage').desc(nulls_last=True),
+        '-ingredients_matched',
+        '-created_at',
+        '-id',
+    )
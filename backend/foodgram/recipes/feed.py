@@ -0,0 +1,121 @@
+"""Лента подписок (FeedEntry).
+
+Новый рецепт раскладывается в ленты подписчиков автора при записи,
+поэтому чтение ленты — один проход по индексу (user, created_at).
+Рецепты популярных авторов (больше FEED_FANOUT_LIMIT подписчиков)
+не раскладываются, а подмешиваются при чтении.
+"""
+from collections import defaultdict
+from itertools import islice
+
+from django.db.models import Q
+from users.models import Subscription
+
+from .models import FeedEntry, PopularAuthor, Recipe
+
+FEED_FANOUT_LIMIT = 10000
+FEED_BACKFILL_SIZE = 100
+FEED_BATCH_SIZE = 1000
+
+
+def is_popular_author(author_id):
+    """Проверяет, собирается ли лента автора при чтении. Автор,
+    перешедший порог подписчиков, отмечается один раз и навсегда."""
+    if PopularAuthor.objects.filter(author_id=author_id).exists():
+        return True
+    over_limit = Subscription.objects.filter(author_id=author_id).order_by(
+        'pk'
+    )[FEED_FANOUT_LIMIT:FEED_FANOUT_LIMIT + 1].exists()
+    if over_limit:
+        PopularAuthor.objects.get_or_create(author_id=author_id)
+    return over_limit
+
+
+def create_entries(entries):
+    """Сохраняет записи ленты из итератора пачками по FEED_BATCH_SIZE."""
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, FEED_BATCH_SIZE))
+        if not batch:
+            return
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_recipes(recipes):
+    """Раскладывает новые рецепты в ленты подписчиков их авторов."""
+    recipes_by_author = defaultdict(list)
+    for recipe in recipes:
+        recipes_by_author[recipe.author_id].append(recipe)
+    author_ids = [
+        author_id for author_id in recipes_by_author
+        if not is_popular_author(author_id)
+    ]
+    if not author_ids:
+        return
+    subscriptions = (
+        Subscription.objects.filter(author_id__in=author_ids)
+        .values_list('subscriber_id', 'author_id')
+        .iterator(chunk_size=FEED_BATCH_SIZE)
+    )
+    create_entries(
+        FeedEntry(
+            user_id=subscriber_id,
+            recipe_id=recipe.id,
+            author_id=author_id,
+            created_at=recipe.created_at,
+        )
+        for subscriber_id, author_id in subscriptions
+        for recipe in recipes_by_author[author_id]
+    )
+
+
+def fan_out_recipe(recipe):
+    """Раскладывает новый рецепт в ленты подписчиков автора."""
+    fan_out_recipes([recipe])
+
+
+def backfill_subscription(subscriber_id, author_id):
+    """Добавляет в ленту новые рецепты автора после подписки."""
+    if is_popular_author(author_id):
+        return
+    recipes = (
+        Recipe.objects.filter(author_id=author_id)
+        .order_by('-created_at', '-id')
+        .values_list('id', 'created_at')[:FEED_BACKFILL_SIZE]
+    )
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user_id=subscriber_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                created_at=created_at,
+            )
+            for recipe_id, created_at in recipes
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def trim_subscription(subscriber_id, author_id):
+    """Убирает рецепты автора из ленты после отписки."""
+    FeedEntry.objects.filter(
+        user_id=subscriber_id, author_id=author_id
+    ).delete()
+
+
+def filter_feed(queryset, user):
+    """Ограничивает queryset рецептов лентой пользователя, новые первыми."""
+    popular_author_ids = list(
+        PopularAuthor.objects.filter(
+            author__subscribers__subscriber=user
+        ).values_list('author_id', flat=True)
+    )
+    if not popular_author_ids:
+        return queryset.filter(feed_entries__user=user).order_by(
+            '-feed_entries__created_at', '-feed_entries__recipe'
+        )
+    return queryset.filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('recipe'))
+        | Q(author_id__in=popular_author_ids)
+    ).order_by('-created_at', '-id')
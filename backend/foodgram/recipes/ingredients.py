@@ -0,0 +1,40 @@
+"""Нормализация и загрузка ингредиентов."""
+from .models import Ingredient
+from .streams import iter_chunks
+
+
+def normalize_ingredient(name, measurement_unit):
+    """Имя в нижнем регистре с одиночными пробелами, единица
+    без пробелов по краям."""
+    return (
+        ' '.join(str(name).split()).lower(),
+        ' '.join(str(measurement_unit).split()),
+    )
+
+
+def load_ingredients(rows, chunk_size=1000):
+    """Добавляет пары (name, measurement_unit), которых еще нет.
+    Повторная загрузка тех же данных ничего не меняет.
+    Возвращает (прочитано, добавлено)."""
+    total = created = 0
+    for chunk in iter_chunks(rows, chunk_size):
+        ingredients = {
+            normalize_ingredient(name, measurement_unit)
+            for name, measurement_unit in chunk
+        }
+        total += len(chunk)
+        existing = set(
+            Ingredient.objects.filter(
+                name__in={name for name, _ in ingredients}
+            ).values_list('name', 'measurement_unit')
+        )
+        new_ingredients = sorted(ingredients - existing)
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name=name, measurement_unit=measurement_unit)
+                for name, measurement_unit in new_ingredients
+            ],
+            ignore_conflicts=True,
+        )
+        created += len(new_ingredients)
+    return total, created
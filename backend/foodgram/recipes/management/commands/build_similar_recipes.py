@@ -0,0 +1,22 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.similarity import SIMILAR_RECIPES_LIMIT, build_similar_recipes
+
+
+class Command(BaseCommand):
+    help = (
+        f'Пересобирает похожие рецепты: до {SIMILAR_RECIPES_LIMIT} '
+        'соседей на рецепт по общим ингредиентам и тегам. Запускать '
+        'периодически и после import_recipes.'
+    )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        with transaction.atomic():
+            recipes, created = build_similar_recipes()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {recipes} рецептов, {created} пар '
+            f'за {perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,257 @@
+import os
+from time import perf_counter
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes import feed
+from recipes.ingredients import normalize_ingredient
+from recipes.models import Ingredient, IngredientRecipeAmount, Recipe, Tag
+from recipes.search import update_search_vectors
+from recipes.signals import recipes_changed
+from recipes.streams import iter_chunks, iter_records
+from users.models import User
+
+MAX_ERRORS_SHOWN = 20
+
+
+class RecordError(Exception):
+    """Ошибка в отдельной записи импорта"""
+
+
+def is_integer(value):
+    # bool в JSON — не число, хотя и подкласс int
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует рецепты из NDJSON или JSON-массива потоком, '
+        'пачками bulk_create. Запись: name, text, cooking_time, image '
+        '(путь относительно --images), author (username), tags (slug), '
+        'ingredients: [{id или name и measurement_unit, amount}].'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл NDJSON или JSON-массива.')
+        parser.add_argument(
+            '--images',
+            required=True,
+            help='Каталог с файлами изображений.',
+        )
+        parser.add_argument(
+            '--author',
+            help='username автора для записей без поля author.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько рецептов сохранять за одну транзакцию.',
+        )
+
+    def load_lookups(self):
+        """Словари для разрешения тегов и ингредиентов без запросов."""
+        self.tags = {}
+        for tag_id, slug in Tag.objects.values_list('id', 'slug'):
+            self.tags[slug] = tag_id
+            self.tags[tag_id] = tag_id
+        self.ingredients = {}
+        for ingredient_id, name, measurement_unit in (
+            Ingredient.objects.values_list('id', 'name', 'measurement_unit')
+        ):
+            self.ingredients[ingredient_id] = ingredient_id
+            self.ingredients[
+                normalize_ingredient(name, measurement_unit)
+            ] = ingredient_id
+        self.authors = {}
+
+    def get_author_id(self, username):
+        if not username:
+            raise RecordError('Не указан автор')
+        if not isinstance(username, str):
+            raise RecordError('author должен быть строкой')
+        if username not in self.authors:
+            self.authors[username] = (
+                User.objects.filter(username=username)
+                .values_list('id', flat=True).first()
+            )
+        if self.authors[username] is None:
+            raise RecordError(f'Автор {username} не найден')
+        return self.authors[username]
+
+    def get_ingredient_id(self, ingredient):
+        if not isinstance(ingredient, dict):
+            raise RecordError('Ингредиент должен быть объектом')
+        key = ingredient.get('id')
+        if key is not None and not is_integer(key):
+            raise RecordError('id ингредиента должен быть целым числом')
+        if key is None:
+            key = normalize_ingredient(
+                ingredient.get('name', ''),
+                ingredient.get('measurement_unit', ''),
+            )
+        ingredient_id = self.ingredients.get(key)
+        if ingredient_id is None:
+            raise RecordError(f'Ингредиент {key} не найден')
+        return ingredient_id
+
+    def get_tag_id(self, tag):
+        if not isinstance(tag, str) and not is_integer(tag):
+            raise RecordError('Тег задается slug или id')
+        tag_id = self.tags.get(tag)
+        if tag_id is None:
+            raise RecordError(f'Тег {tag} не найден')
+        return tag_id
+
+    def get_amounts(self, ingredients):
+        """{ingredient_id: amount} из списка ингредиентов записи."""
+        amounts = {}
+        for ingredient in ingredients:
+            ingredient_id = self.get_ingredient_id(ingredient)
+            if ingredient_id in amounts:
+                raise RecordError('Дублирующиеся ингредиенты')
+            amount = ingredient.get('amount')
+            if not is_integer(amount) or amount < 1:
+                raise RecordError('Количество должно быть целым от 1')
+            amounts[ingredient_id] = amount
+        return amounts
+
+    def get_image_path(self, image):
+        """Путь к файлу изображения внутри каталога --images."""
+        if not image or not isinstance(image, str):
+            raise RecordError('Не указано изображение')
+        image_path = os.path.realpath(os.path.join(self.images, image))
+        if os.path.commonpath([self.images, image_path]) != self.images:
+            raise RecordError(f'Файл {image} вне каталога изображений')
+        if not os.path.isfile(image_path):
+            raise RecordError(f'Файл {image_path} не найден')
+        return image_path
+
+    def parse_record(self, record):
+        """Recipe, [(ingredient_id, amount)], [tag_id] из записи."""
+        if not isinstance(record, dict):
+            raise RecordError('Запись должна быть объектом')
+        ingredients = record.get('ingredients') or []
+        tags = record.get('tags') or []
+        if not ingredients or not tags:
+            raise RecordError('Ингредиенты и теги обязательны для заполнения.')
+        if not isinstance(ingredients, list) or not isinstance(tags, list):
+            raise RecordError('ingredients и tags должны быть списками')
+        amounts = self.get_amounts(ingredients)
+        name = record.get('name')
+        text = record.get('text')
+        cooking_time = record.get('cooking_time')
+        if (
+            not isinstance(name, str) or not isinstance(text, str)
+            or not name or len(name) > 200 or not text
+        ):
+            raise RecordError('Некорректные name или text')
+        if not is_integer(cooking_time) or cooking_time < 1:
+            raise RecordError('cooking_time должно быть целым от 1')
+        image_path = self.get_image_path(record.get('image'))
+        recipe = Recipe(
+            author_id=self.get_author_id(
+                record.get('author', self.default_author)
+            ),
+            name=name,
+            text=text,
+            cooking_time=cooking_time,
+            ingredients_count=len(amounts),
+        )
+        recipe.image_path = image_path
+        tag_ids = list(dict.fromkeys(self.get_tag_id(tag) for tag in tags))
+        return recipe, list(amounts.items()), tag_ids
+
+    def read_chunks(self, stream, chunk_size):
+        """Пачки пронумерованных записей. Ошибки формата файла
+        становятся CommandError; ошибки сохранения сюда не попадают."""
+        try:
+            yield from iter_chunks(enumerate(iter_records(stream), 1),
+                                   chunk_size)
+        except ValueError as error:
+            raise CommandError(f'Ошибка формата: {error}')
+
+    def parse_chunk(self, chunk):
+        """Разбирает пронумерованные записи, ошибочные пропускает."""
+        parsed = []
+        for number, record in chunk:
+            try:
+                parsed.append(self.parse_record(record))
+            except RecordError as error:
+                self.errors += 1
+                if self.errors <= MAX_ERRORS_SHOWN:
+                    self.stderr.write(f'Запись {number}: {error}')
+        return parsed
+
+    def save_chunk(self, parsed):
+        """Сохраняет пачку в одной транзакции. Файлы изображений
+        в транзакцию не входят, поэтому при откате удаляются."""
+        saved = []
+        try:
+            with transaction.atomic():
+                for recipe, _, _ in parsed:
+                    with open(recipe.image_path, 'rb') as image:
+                        recipe.image = default_storage.save(
+                            Recipe._meta.get_field('image').generate_filename(
+                                recipe, os.path.basename(recipe.image_path)
+                            ),
+                            File(image),
+                        )
+                    saved.append(recipe.image.name)
+                self.save_rows(parsed)
+        except BaseException:
+            for name in saved:
+                default_storage.delete(name)
+            raise
+
+    def save_rows(self, parsed):
+        recipes = Recipe.objects.bulk_create(
+            [recipe for recipe, _, _ in parsed]
+        )
+        IngredientRecipeAmount.objects.bulk_create(
+            IngredientRecipeAmount(
+                recipe_id=recipe.id, ingredient_id=ingredient_id, amount=amount
+            )
+            for recipe, amounts, _ in parsed
+            for ingredient_id, amount in amounts
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+            for recipe, _, tag_ids in parsed
+            for tag_id in tag_ids
+        )
+        recipe_ids = [recipe.id for recipe in recipes]
+        recipes_changed.send(sender=Recipe, recipe_ids=recipe_ids)
+        update_search_vectors(recipe_ids)
+        feed.fan_out_recipes(recipes)
+
+    def handle(self, *args, **options):
+        self.images = os.path.realpath(options['images'])
+        self.default_author = options['author']
+        chunk_size = options['chunk_size']
+        if not os.path.isdir(self.images):
+            raise CommandError(f'Каталог {self.images} не найден')
+        if chunk_size < 1:
+            raise CommandError('--chunk-size должен быть больше 0')
+        self.load_lookups()
+        self.errors = 0
+        imported = 0
+        started = perf_counter()
+        with open(options['path'], encoding='utf-8') as stream:
+            for chunk in self.read_chunks(stream, chunk_size):
+                parsed = self.parse_chunk(chunk)
+                if parsed:
+                    self.save_chunk(parsed)
+                    imported += len(parsed)
+                elapsed = perf_counter() - started
+                self.stdout.write(
+                    f'Импортировано {imported}, '
+                    f'{imported / elapsed:.0f} рецептов/с'
+                )
+        elapsed = perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {imported} рецептов за {elapsed:.1f} с '
+            f'({imported / elapsed:.0f} рецептов/с), ошибок: {self.errors}'
+        ))
@@ -0,0 +1,66 @@
+import csv
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from recipes.ingredients import load_ingredients
+from recipes.models import Ingredient
+from recipes.signals import ingredients_loaded
+from recipes.streams import iter_records
+
+
+def iter_csv_rows(stream):
+    for row in csv.reader(stream):
+        if len(row) != 2:
+            raise ValueError(f'Ожидались name и measurement_unit: {row}')
+        if row != ['name', 'measurement_unit']:
+            yield row
+
+
+def iter_json_rows(stream):
+    """Пары из записей {name, measurement_unit} и из фикстур
+    manage.py dumpdata (ингредиенты берутся из model recipes.ingredient)."""
+    for record in iter_records(stream):
+        if 'model' in record:
+            if record['model'] != 'recipes.ingredient':
+                continue
+            record = record['fields']
+        yield record['name'], record['measurement_unit']
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает ингредиенты из CSV (name,measurement_unit) или JSON '
+        '(список объектов, NDJSON или фикстура dumpdata). Уже '
+        'существующие пары (name, measurement_unit) пропускаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .csv или .json.')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько ингредиентов добавлять за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть больше 0')
+        read_rows = (
+            iter_csv_rows
+            if os.path.splitext(path)[1].lower() == '.csv'
+            else iter_json_rows
+        )
+        try:
+            with open(path, encoding='utf-8', newline='') as stream:
+                total, created = load_ingredients(
+                    read_rows(stream), options['chunk_size']
+                )
+        except (KeyError, TypeError, ValueError) as error:
+            raise CommandError(f'Ошибка формата: {error!r}')
+        if created:
+            ingredients_loaded.send(sender=Ingredient)
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано {total}, добавлено {created} ингредиентов'
+        ))
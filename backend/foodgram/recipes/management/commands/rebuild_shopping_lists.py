@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from recipes.shopping_list import find_mismatches, rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет агрегированные списки покупок с полным пересчетом '
+        'по ShoppingCart и перестраивает их.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить, без перестроения.',
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Ограничить пользователями с указанными id.',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        mismatches = find_mismatches(user_ids)
+        if options['check']:
+            if mismatches:
+                raise CommandError(
+                    'Расхождения у пользователей: '
+                    + ', '.join(map(str, mismatches))
+                )
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+        rebuild_shopping_lists(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок перестроены, исправлено: {len(mismatches)}'
+        ))
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.4 on 2026-10-18 03:16
+
+from django.db import migrations, models
+
+
+def remove_duplicates(apps, schema_editor):
+    """Оставляет по одной записи на (user, recipe); списки покупок
+    пользователей с дублями в корзине пересчитываются."""
+    FavoriteRecipe = apps.get_model('recipes', 'FavoriteRecipe')
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    IngredientRecipeAmount = apps.get_model(
+        'recipes', 'IngredientRecipeAmount'
+    )
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    affected_users = set()
+    for model, recipe_field in (
+        (FavoriteRecipe, 'recipe'),
+        (ShoppingCart, 'shopping_recipe'),
+    ):
+        duplicates = (
+            model.objects.values('user', recipe_field)
+            .annotate(keep_id=models.Min('id'), count=models.Count('id'))
+            .filter(count__gt=1)
+            .order_by()
+        )
+        for row in duplicates:
+            model.objects.filter(
+                user=row['user'], **{recipe_field: row[recipe_field]}
+            ).exclude(id=row['keep_id']).delete()
+            if model is ShoppingCart:
+                affected_users.add(row['user'])
+    if not affected_users:
+        return
+    ShoppingListItem.objects.filter(user__in=affected_users).delete()
+    rows = (
+        IngredientRecipeAmount.objects.filter(
+            recipe__shoppingcart__user__in=affected_users
+        )
+        .values('ingredient_id', user_id=models.F('recipe__shoppingcart__user'))
+        .annotate(total=models.Sum('amount'))
+        .order_by()
+    )
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(
+                user_id=row['user_id'],
+                ingredient_id=row['ingredient_id'],
+                amount=row['total'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_feedentry_popularauthor'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='favoriterecipe',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='favorite_user_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'shopping_recipe'), name='shopping_cart_user_recipe'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.4 on 2026-10-18 03:23
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def normalize_ingredient(name, measurement_unit):
+    return ' '.join(name.split()).lower(), ' '.join(measurement_unit.split())
+
+
+def merge_rows(model, owner_field, keep_id, ingredient_ids):
+    """Сводит строки дублей к одной строке keep_id на владельца,
+    суммируя количества. Возвращает id владельцев."""
+    rows = defaultdict(list)
+    for row in model.objects.filter(
+        ingredient_id__in=ingredient_ids
+    ).order_by('id'):
+        rows[getattr(row, owner_field)].append(row)
+    for owner_rows in rows.values():
+        target, *others = owner_rows
+        if not others and target.ingredient_id == keep_id:
+            continue
+        target.amount += sum(row.amount for row in others)
+        target.ingredient_id = keep_id
+        model.objects.filter(id__in=[row.id for row in others]).delete()
+        target.save(update_fields=['amount', 'ingredient'])
+    return set(rows)
+
+
+def merge_duplicates(apps, schema_editor):
+    """Нормализует имена и сливает ингредиенты с одинаковыми
+    (name, measurement_unit), перенося их количества в рецептах
+    и списках покупок на оставшийся ингредиент."""
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientRecipeAmount = apps.get_model(
+        'recipes', 'IngredientRecipeAmount'
+    )
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    groups = defaultdict(list)
+    for ingredient in Ingredient.objects.order_by('id').iterator():
+        groups[
+            normalize_ingredient(ingredient.name, ingredient.measurement_unit)
+        ].append(ingredient)
+    changed_ids = set()
+    to_rename = []
+    for (name, measurement_unit), ingredients in groups.items():
+        keep, *duplicates = ingredients
+        if (keep.name, keep.measurement_unit) != (name, measurement_unit):
+            keep.name, keep.measurement_unit = name, measurement_unit
+            to_rename.append(keep)
+            changed_ids.add(keep.id)
+        if not duplicates:
+            continue
+        ingredient_ids = [ingredient.id for ingredient in ingredients]
+        merge_rows(IngredientRecipeAmount, 'recipe_id', keep.id, ingredient_ids)
+        merge_rows(ShoppingListItem, 'user_id', keep.id, ingredient_ids)
+        Ingredient.objects.filter(id__in=ingredient_ids[1:]).delete()
+        changed_ids.add(keep.id)
+    Ingredient.objects.bulk_update(
+        to_rename, ['name', 'measurement_unit'], batch_size=1000
+    )
+    # Документы пересоберутся при чтении.
+    Recipe.objects.filter(ingredients__in=changed_ids).update(document='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_favorite_shopping_cart_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='ingredient_name_measurement_unit'),
+        ),
+    ]
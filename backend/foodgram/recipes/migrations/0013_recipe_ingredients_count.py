@@ -0,0 +1,46 @@
+# Generated by Django 4.2.4 on 2026-10-18 03:32
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_ingredients_counts(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    IngredientRecipeAmount = apps.get_model(
+        'recipes', 'IngredientRecipeAmount'
+    )
+    Recipe.objects.update(
+        ingredients_count=Coalesce(
+            models.Subquery(
+                IngredientRecipeAmount.objects.filter(
+                    recipe=models.OuterRef('pk')
+                ).order_by().values('recipe').annotate(
+                    count=models.Count('pk')
+                ).values('count'),
+                output_field=models.IntegerField(),
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            fill_ingredients_counts, migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name='ingredientrecipeamount',
+            index=models.Index(fields=['ingredient', 'recipe'], name='ingredient_recipe'),
+        ),
+    ]
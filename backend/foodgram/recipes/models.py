@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 from users.models import User
@@ -9,6 +10,14 @@ class Ingredient(models.Model):
     name = models.CharField(max_length=200, db_index=True)
     measurement_unit = models.CharField(max_length=20)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='ingredient_name_measurement_unit',
+            )
+        ]
+
     def __str__(self):
         return self.name
 
@@ -49,6 +58,18 @@ class Recipe(models.Model):
                                        validators=[MinValueValidator(1)])
     image = models.ImageField(blank=False, upload_to='recipe_images/')
     created_at = models.DateTimeField(auto_now_add=True)
+    document = models.TextField(blank=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    ingredients_count = models.PositiveIntegerField(
+        default=0, editable=False
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'], name='recipe_created_at_id'
+            )
+        ]
 
 
 class IngredientRecipeAmount(models.Model):
@@ -71,6 +92,11 @@ class IngredientRecipeAmount(models.Model):
                 fields=['recipe', 'ingredient'], name='recipe_ingredient'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['ingredient', 'recipe'], name='ingredient_recipe'
+            )
+        ]
 
 
 class FavoriteRecipe(models.Model):
@@ -79,9 +105,105 @@ class FavoriteRecipe(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'], name='favorite_user_recipe'
+            )
+        ]
+
 
 class ShoppingCart(models.Model):
     """Модель список покупок"""
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     shopping_recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'shopping_recipe'],
+                name='shopping_cart_user_recipe',
+            )
+        ]
+
+
+class ShoppingListItem(models.Model):
+    """Модель агрегированного списка покупок: сумма ингредиента
+    по всем рецептам из списка покупок пользователя"""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='shopping_list'
+    )
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
+    amount = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'], name='shopping_list_ingredient'
+            )
+        ]
+
+
+class FeedEntry(models.Model):
+    """Модель ленты подписок: рецепт автора, разложенный подписчику"""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='feed'
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='+'
+    )
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'], name='feed_user_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-created_at', '-recipe'],
+                name='feed_user_created_at',
+            ),
+            models.Index(fields=['user', 'author'], name='feed_user_author'),
+        ]
+
+
+class PopularAuthor(models.Model):
+    """Автор с большим числом подписчиков: его рецепты не раскладываются
+    по лентам, а подмешиваются при чтении"""
+
+    author = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name='+'
+    )
+
+
+class SimilarRecipe(models.Model):
+    """Модель похожих рецептов: заранее посчитанные ближайшие соседи
+    рецепта по ингредиентам и тегам"""
+
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='similar'
+    )
+    similar = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='similar_to'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'], name='similar_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'], name='similar_recipe_score'
+            )
+        ]
@@ -0,0 +1,80 @@
+"""Поиск рецептов и ингредиентов по тексту.
+
+На PostgreSQL рецепты ищутся полнотекстово по Recipe.search_vector
+(name с весом A, text с весом B) и по триграммной похожести слов name
+и text, что дает поиск по части слова и с опечатками; ингредиенты —
+по триграммам name. Индексы GIN создает миграция 0012. На других СУБД
+(SQLite в тестах) поиск сводится к icontains, выше совпадения
+с начала названия.
+"""
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector,
+                                            TrigramWordSimilarity)
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from .models import Recipe
+
+SEARCH_CONFIG = 'russian'
+
+
+def is_postgresql(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def recipe_search_vector():
+    return SearchVector(
+        'name', weight='A', config=SEARCH_CONFIG
+    ) + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+
+
+def update_search_vectors(recipe_ids):
+    """Пересчитывает Recipe.search_vector указанных рецептов."""
+    queryset = Recipe.objects.filter(pk__in=list(recipe_ids))
+    if is_postgresql(queryset):
+        queryset.update(search_vector=recipe_search_vector())
+
+
+def prefix_rank(field, query):
+    """Ранг без PostgreSQL: 2 — совпадение с начала, 1 — в середине."""
+    return Case(
+        When(**{f'{field}__istartswith': query}, then=Value(2)),
+        When(**{f'{field}__icontains': query}, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def search_recipes(queryset, query):
+    """Рецепты, подходящие под query, от более релевантных
+    к менее (аннотация search_rank)."""
+    if not is_postgresql(queryset):
+        return queryset.filter(
+            Q(name__icontains=query) | Q(text__icontains=query)
+        ).annotate(search_rank=prefix_rank('name', query)).order_by(
+            '-search_rank', '-created_at', '-id'
+        )
+    search_query = SearchQuery(
+        query, config=SEARCH_CONFIG, search_type='websearch'
+    )
+    return queryset.filter(
+        Q(search_vector=search_query)
+        | Q(name__trigram_word_similar=query)
+        | Q(text__trigram_word_similar=query)
+    ).annotate(
+        search_rank=(
+            SearchRank(F('search_vector'), search_query)
+            + TrigramWordSimilarity(query, 'name')
+        )
+    ).order_by('-search_rank', '-created_at', '-id')
+
+
+def search_ingredient_names(queryset, query):
+    """Ингредиенты, похожие на query, от более похожих к менее."""
+    if not is_postgresql(queryset):
+        return queryset.filter(name__icontains=query).annotate(
+            search_rank=prefix_rank('name', query)
+        ).order_by('-search_rank', 'name')
+    return queryset.filter(name__trigram_word_similar=query).annotate(
+        search_rank=TrigramWordSimilarity(query, 'name')
+    ).order_by('-search_rank', 'name')
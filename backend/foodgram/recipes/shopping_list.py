@@ -0,0 +1,204 @@
+"""Поддержка агрегированного списка покупок (ShoppingListItem).
+
+Изменения применяются дельтами в транзакции вызывающего кода.
+Добавление и удаление строк ShoppingCart и удаление рецептов
+учитываются обработчиками сигналов моделей (recipes.signals), поэтому
+агрегат верен при любом пути записи; пакетная вставка (bulk_create
+без сигналов) и изменение ингредиентов рецепта вызывают add_recipes
+и change_recipe явно. Строки рецептов и затем пользователей
+блокируются SELECT FOR UPDATE: изменение ингредиентов рецепта
+и добавление или удаление его в корзине выполняются последовательно
+и читают уже зафиксированные данные друг друга, как и параллельные
+изменения одного списка.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from users.models import User
+
+from .models import (IngredientRecipeAmount, Recipe, ShoppingCart,
+                     ShoppingListItem)
+
+
+def lock_recipes(recipe_ids):
+    """Блокирует строки рецептов до конца транзакции."""
+    list(
+        Recipe.objects.select_for_update()
+        .filter(pk__in=list(recipe_ids)).order_by('pk').values_list('pk')
+    )
+
+
+def get_recipe_amounts(recipe_id):
+    """Количества ингредиентов рецепта: {ingredient_id: amount}."""
+    return dict(
+        IngredientRecipeAmount.objects.filter(recipe_id=recipe_id)
+        .values_list('ingredient_id', 'amount')
+    )
+
+
+def apply_changes(changes):
+    """Применяет дельты {user_id: {ingredient_id: delta}} к агрегату."""
+    changes = {
+        user_id: deltas for user_id, deltas in changes.items()
+        if any(deltas.values())
+    }
+    if not changes:
+        return
+    ingredient_ids = set().union(*changes.values())
+    with transaction.atomic():
+        list(
+            User.objects.select_for_update()
+            .filter(pk__in=changes).order_by('pk').values_list('pk')
+        )
+        items = {
+            (item.user_id, item.ingredient_id): item
+            for item in ShoppingListItem.objects.filter(
+                user_id__in=changes, ingredient_id__in=ingredient_ids
+            )
+        }
+        to_create, to_update, to_delete = [], [], []
+        for user_id, deltas in changes.items():
+            for ingredient_id, delta in deltas.items():
+                if not delta:
+                    continue
+                item = items.get((user_id, ingredient_id))
+                if item is None:
+                    if delta > 0:
+                        to_create.append(ShoppingListItem(
+                            user_id=user_id,
+                            ingredient_id=ingredient_id,
+                            amount=delta,
+                        ))
+                    continue
+                item.amount += delta
+                if item.amount > 0:
+                    to_update.append(item)
+                else:
+                    to_delete.append(item.pk)
+        ShoppingListItem.objects.bulk_create(to_create)
+        ShoppingListItem.objects.bulk_update(to_update, ['amount'])
+        ShoppingListItem.objects.filter(pk__in=to_delete).delete()
+
+
+def get_recipes_amounts(recipe_ids):
+    """Суммарные количества ингредиентов рецептов:
+    {ingredient_id: amount}."""
+    return dict(
+        IngredientRecipeAmount.objects.filter(recipe_id__in=recipe_ids)
+        .values_list('ingredient_id')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+
+
+@transaction.atomic
+def add_recipes(user_id, recipe_ids):
+    """Учитывает рецепты, добавленные в список покупок пользователя."""
+    lock_recipes(recipe_ids)
+    apply_changes({user_id: get_recipes_amounts(recipe_ids)})
+
+
+@transaction.atomic
+def remove_recipes(user_id, recipe_ids):
+    """Учитывает рецепты, удаленные из списка покупок пользователя."""
+    lock_recipes(recipe_ids)
+    amounts = get_recipes_amounts(recipe_ids)
+    apply_changes({
+        user_id: {
+            ingredient_id: -amount
+            for ingredient_id, amount in amounts.items()
+        }
+    })
+
+
+@transaction.atomic
+def change_recipe(recipe_id, old_amounts, new_amounts):
+    """Переносит изменение ингредиентов рецепта в списки покупок
+    всех пользователей, у которых этот рецепт в корзине. Корзины
+    читаются после блокировки рецепта, поэтому параллельное добавление
+    в корзину либо уже учтено здесь, либо прочитает новые количества."""
+    deltas = Counter(new_amounts)
+    deltas.subtract(old_amounts)
+    if not any(deltas.values()):
+        return
+    lock_recipes([recipe_id])
+    carts = (
+        ShoppingCart.objects.filter(shopping_recipe_id=recipe_id)
+        .values('user_id').annotate(count=Count('id'))
+    )
+    apply_changes({
+        cart['user_id']: {
+            ingredient_id: delta * cart['count']
+            for ingredient_id, delta in deltas.items()
+        }
+        for cart in carts
+    })
+
+
+def delete_recipe(recipe_id):
+    """Убирает рецепт из списков покупок перед его удалением."""
+    change_recipe(recipe_id, get_recipe_amounts(recipe_id), {})
+
+
+def compute_shopping_lists(user_ids=None):
+    """Полный пересчет: {user_id: {ingredient_id: amount}}."""
+    # одно условие filter() на связь с корзиной: второй вызов
+    # присоединил бы ShoppingCart повторно и удвоил суммы
+    conditions = {'recipe__shoppingcart__isnull': False}
+    if user_ids is not None:
+        conditions['recipe__shoppingcart__user__in'] = user_ids
+    queryset = IngredientRecipeAmount.objects.filter(**conditions)
+    rows = (
+        queryset.values(
+            'ingredient_id', user_id=F('recipe__shoppingcart__user')
+        )
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    shopping_lists = defaultdict(dict)
+    for row in rows.iterator():
+        shopping_lists[row['user_id']][row['ingredient_id']] = row['total']
+    return shopping_lists
+
+
+def get_stored_shopping_lists(user_ids=None):
+    """Содержимое агрегата: {user_id: {ingredient_id: amount}}."""
+    queryset = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    shopping_lists = defaultdict(dict)
+    for user_id, ingredient_id, amount in queryset.values_list(
+        'user_id', 'ingredient_id', 'amount'
+    ).iterator():
+        shopping_lists[user_id][ingredient_id] = amount
+    return shopping_lists
+
+
+def find_mismatches(user_ids=None):
+    """Пользователи, у которых агрегат расходится с пересчетом."""
+    expected = compute_shopping_lists(user_ids)
+    stored = get_stored_shopping_lists(user_ids)
+    return sorted(
+        user_id for user_id in set(expected) | set(stored)
+        if expected.get(user_id, {}) != stored.get(user_id, {})
+    )
+
+
+@transaction.atomic
+def rebuild_shopping_lists(user_ids=None):
+    """Перестраивает агрегат с нуля по данным ShoppingCart."""
+    queryset = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    queryset.delete()
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, amount=amount
+            )
+            for user_id, amounts in compute_shopping_lists(user_ids).items()
+            for ingredient_id, amount in amounts.items()
+        ),
+        batch_size=1000,
+    )
@@ -0,0 +1,42 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import Signal, receiver
+from users.models import User
+
+from . import shopping_list
+from .models import Recipe, ShoppingCart
+
+# Рецепты recipe_ids изменены в обход API (админка, импорт);
+# api.signals пересобирает по нему документы и сбрасывает кеши.
+recipes_changed = Signal()
+# Каталог ингредиентов пополнен пакетной вставкой без сигналов моделей.
+ingredients_loaded = Signal()
+
+
+def deletion_origin(origin):
+    """Модель, с которой началось удаление (объект или QuerySet)."""
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    shopping_list.delete_recipe(instance.id)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_added(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        shopping_list.add_recipes(
+            instance.user_id, [instance.shopping_recipe_id]
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def shopping_cart_deleting(sender, instance, origin=None, **kwargs):
+    # удаление рецепта учитывает recipe_deleting, а список покупок
+    # удаляемого пользователя удаляется вместе с ним
+    if deletion_origin(origin) in (Recipe, User):
+        return
+    shopping_list.remove_recipes(
+        instance.user_id, [instance.shopping_recipe_id]
+    )
@@ -0,0 +1,224 @@
+"""Похожие рецепты (SimilarRecipe).
+
+Рецепт описывается множествами ингредиентов и тегов, похожесть —
+взвешенная сумма коэффициентов Жаккара этих множеств. Для каждого
+рецепта хранятся SIMILAR_RECIPES_LIMIT лучших соседей, поэтому чтение —
+один проход по индексу (recipe, score). Весь список строит команда
+build_similar_recipes: кандидаты берутся из обратного индекса
+ингредиент -> рецепты, а не перебором всех пар. При сохранении рецепта
+refresh_recipe пересчитывает его соседей и вставляет его в списки
+соседей кандидатов.
+
+Ингредиент, который есть больше чем в SIMILAR_MAX_DOCUMENT_FREQUENCY
+рецептах (соль, вода), почти ничего не говорит о похожести и кандидатов
+не порождает, хотя в коэффициенте Жаккара учитывается. Рецепт только
+из таких ингредиентов берет кандидатами последние
+SIMILAR_MAX_DOCUMENT_FREQUENCY рецептов каждого из них. Так число
+кандидатов рецепта ограничено, и пересборка растет линейно, а не
+как число пар.
+"""
+import heapq
+from collections import defaultdict
+from itertools import chain
+
+from django.db.models import Count, Exists, OuterRef, Q
+
+from .models import Ingredient, IngredientRecipeAmount, Recipe, SimilarRecipe
+from .streams import iter_chunks
+
+SIMILAR_RECIPES_LIMIT = 10
+SIMILAR_CANDIDATES_LIMIT = 1000
+SIMILAR_MAX_DOCUMENT_FREQUENCY = 200
+SIMILAR_TAG_WEIGHT = 0.2
+SIMILAR_BATCH_SIZE = 1000
+
+
+def jaccard(first, second):
+    union = len(first | second)
+    return len(first & second) / union if union else 0.0
+
+
+def similarity(first, second):
+    """Похожесть двух рецептов по (ингредиенты, теги)."""
+    return (
+        (1 - SIMILAR_TAG_WEIGHT) * jaccard(first[0], second[0])
+        + SIMILAR_TAG_WEIGHT * jaccard(first[1], second[1])
+    )
+
+
+def top_neighbours(scores):
+    """Лучшие SIMILAR_RECIPES_LIMIT пар (recipe_id, score)."""
+    return heapq.nlargest(
+        SIMILAR_RECIPES_LIMIT,
+        scores.items(),
+        key=lambda item: (item[1], item[0]),
+    )
+
+
+def load_vectors(recipe_ids=None):
+    """{recipe_id: (frozenset ингредиентов, frozenset тегов)}
+    для указанных (или всех) рецептов: два запроса."""
+    ingredients = defaultdict(set)
+    tags = defaultdict(set)
+    amounts = IngredientRecipeAmount.objects.all()
+    recipe_tags = Recipe.tags.through.objects.all()
+    if recipe_ids is not None:
+        amounts = amounts.filter(recipe_id__in=recipe_ids)
+        recipe_tags = recipe_tags.filter(recipe_id__in=recipe_ids)
+    for recipe_id, ingredient_id in amounts.values_list(
+        'recipe_id', 'ingredient_id'
+    ).iterator():
+        ingredients[recipe_id].add(ingredient_id)
+    for recipe_id, tag_id in recipe_tags.values_list(
+        'recipe_id', 'tag_id'
+    ).iterator():
+        tags[recipe_id].add(tag_id)
+    return {
+        recipe_id: (frozenset(recipe_ingredients), frozenset(tags[recipe_id]))
+        for recipe_id, recipe_ingredients in ingredients.items()
+    }
+
+
+def get_candidates(ingredients, postings):
+    """Кандидаты по спискам рецептов (по возрастанию id) ингредиентов."""
+    rare = [
+        ingredient_id for ingredient_id in ingredients
+        if len(postings[ingredient_id]) <= SIMILAR_MAX_DOCUMENT_FREQUENCY
+    ]
+    if rare:
+        return set(chain.from_iterable(
+            postings[ingredient_id] for ingredient_id in rare
+        ))
+    return set(chain.from_iterable(
+        postings[ingredient_id][-SIMILAR_MAX_DOCUMENT_FREQUENCY:]
+        for ingredient_id in ingredients
+    ))
+
+
+def iter_similar_recipes(vectors):
+    """Строки SimilarRecipe для всех рецептов из vectors."""
+    postings = defaultdict(list)
+    for recipe_id in sorted(vectors):
+        for ingredient_id in vectors[recipe_id][0]:
+            postings[ingredient_id].append(recipe_id)
+    for recipe_id, vector in vectors.items():
+        candidates = get_candidates(vector[0], postings)
+        candidates.discard(recipe_id)
+        scores = {
+            candidate: similarity(vector, vectors[candidate])
+            for candidate in candidates
+        }
+        for similar_id, score in top_neighbours(scores):
+            yield SimilarRecipe(
+                recipe_id=recipe_id, similar_id=similar_id, score=score
+            )
+
+
+def build_similar_recipes():
+    """Пересобирает SimilarRecipe целиком. Вызывать в транзакции,
+    чтобы читатели до ее фиксации видели прежние списки.
+    Возвращает число рецептов и число строк."""
+    vectors = load_vectors()
+    SimilarRecipe.objects.all().delete()
+    created = 0
+    for batch in iter_chunks(
+        iter_similar_recipes(vectors), SIMILAR_BATCH_SIZE
+    ):
+        SimilarRecipe.objects.bulk_create(batch)
+        created += len(batch)
+    return len(vectors), created
+
+
+def get_common_ingredient_ids(ingredient_ids):
+    """Ингредиенты, которые есть больше чем
+    в SIMILAR_MAX_DOCUMENT_FREQUENCY рецептах. EXISTS с OFFSET
+    проверяет это, не пересчитывая весь список рецептов ингредиента."""
+    return set(
+        Ingredient.objects.filter(pk__in=ingredient_ids).filter(
+            Exists(
+                IngredientRecipeAmount.objects.filter(
+                    ingredient=OuterRef('pk')
+                )[SIMILAR_MAX_DOCUMENT_FREQUENCY:]
+            )
+        ).values_list('pk', flat=True)
+    )
+
+
+def get_candidate_ids(recipe_id):
+    """Рецепты с общими нечастыми ингредиентами, больше общих — раньше;
+    для рецепта только из частых ингредиентов — последние рецепты
+    с каждым из них."""
+    ingredient_ids = set(
+        IngredientRecipeAmount.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', flat=True)
+    )
+    rare = ingredient_ids - get_common_ingredient_ids(ingredient_ids)
+    if not rare:
+        candidates = set()
+        for ingredient_id in ingredient_ids:
+            candidates.update(
+                IngredientRecipeAmount.objects.filter(
+                    ingredient_id=ingredient_id
+                )
+                .order_by('-recipe_id')
+                .values_list('recipe_id', flat=True)
+                [:SIMILAR_MAX_DOCUMENT_FREQUENCY]
+            )
+        candidates.discard(recipe_id)
+        return list(candidates)
+    return list(
+        IngredientRecipeAmount.objects.filter(ingredient_id__in=rare)
+        .exclude(recipe_id=recipe_id)
+        .values('recipe_id')
+        .annotate(shared=Count('pk'))
+        .order_by('-shared', '-recipe_id')
+        .values_list('recipe_id', flat=True)[:SIMILAR_CANDIDATES_LIMIT]
+    )
+
+
+def insert_into_neighbours(recipe_id, scores):
+    """Строки, которые вставляют recipe_id в списки соседей кандидатов
+    вместо их самых слабых соседей, и id вытесненных строк."""
+    neighbours = defaultdict(list)
+    for row in SimilarRecipe.objects.filter(recipe_id__in=list(scores)):
+        neighbours[row.recipe_id].append(row)
+    rows, to_delete = [], []
+    for candidate, score in scores.items():
+        if len(neighbours[candidate]) >= SIMILAR_RECIPES_LIMIT:
+            weakest = min(
+                neighbours[candidate],
+                key=lambda row: (row.score, row.similar_id),
+            )
+            if (weakest.score, weakest.similar_id) >= (score, recipe_id):
+                continue
+            to_delete.append(weakest.pk)
+        rows.append(SimilarRecipe(
+            recipe_id=candidate, similar_id=recipe_id, score=score
+        ))
+    return rows, to_delete
+
+
+def refresh_recipe(recipe_id):
+    """Пересчитывает соседей рецепта после создания или изменения.
+    Списки, из которых рецепт выпал, дополнит следующий запуск
+    build_similar_recipes."""
+    candidate_ids = get_candidate_ids(recipe_id)
+    vectors = load_vectors([recipe_id, *candidate_ids])
+    SimilarRecipe.objects.filter(
+        Q(recipe_id=recipe_id) | Q(similar_id=recipe_id)
+    ).delete()
+    if recipe_id not in vectors:
+        return
+    scores = {
+        candidate: similarity(vectors[recipe_id], vectors[candidate])
+        for candidate in candidate_ids
+    }
+    rows, to_delete = insert_into_neighbours(recipe_id, scores)
+    rows.extend(
+        SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id, score=score)
+        for similar_id, score in top_neighbours(scores)
+    )
+    if to_delete:
+        SimilarRecipe.objects.filter(pk__in=to_delete).delete()
+    SimilarRecipe.objects.bulk_create(rows, ignore_conflicts=True)
@@ -0,0 +1,86 @@
+"""Потоковое чтение записей из NDJSON и JSON-массивов.
+
+Ошибки формата поднимаются как ValueError во время итерации.
+"""
+import json
+from itertools import islice
+
+READ_SIZE = 1 << 16
+MAX_RECORD_SIZE = 1 << 22
+
+
+def iter_json_array(stream, max_record_size=MAX_RECORD_SIZE):
+    """Объекты JSON-массива по одному, без чтения файла целиком.
+    Буфер недоразобранной записи не растет дальше max_record_size
+    символов: после битой записи файл не дочитывается в память."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    opened = eof = False
+    while True:
+        buffer = buffer.lstrip(', \t\r\n' if opened else ' \t\r\n')
+        if not opened and buffer:
+            if not buffer.startswith('['):
+                raise ValueError('Ожидался JSON-массив')
+            buffer = buffer[1:]
+            opened = True
+            continue
+        if buffer.startswith(']'):
+            return
+        if buffer:
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                pass
+            else:
+                buffer = buffer[end:]
+                yield record
+                continue
+        if eof:
+            raise ValueError('Некорректный или незакрытый JSON-массив')
+        if len(buffer) > max_record_size:
+            raise ValueError(
+                f'Некорректная запись или запись длиннее '
+                f'{max_record_size} символов'
+            )
+        chunk = stream.read(READ_SIZE)
+        eof = not chunk
+        buffer += chunk
+
+
+def iter_ndjson(stream, max_record_size=MAX_RECORD_SIZE):
+    """Объекты NDJSON по одному на строку не длиннее max_record_size."""
+    lines = iter(lambda: stream.readline(max_record_size + 1), '')
+    for line_number, line in enumerate(lines, 1):
+        if len(line) > max_record_size:
+            raise ValueError(
+                f'Строка {line_number} длиннее {max_record_size} символов'
+            )
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as error:
+            raise ValueError(f'Строка {line_number}: {error}')
+
+
+def iter_records(stream):
+    """Формат определяется по первому символу: '[' — JSON-массив,
+    иначе NDJSON."""
+    head = stream.read(1)
+    while head.isspace():
+        head = stream.read(1)
+    stream.seek(0)
+    if head == '[':
+        return iter_json_array(stream)
+    return iter_ndjson(stream)
+
+
+def iter_chunks(records, size):
+    """Списки по size записей из итератора."""
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
@@ -29,6 +29,11 @@ class Subscription(models.Model):
 
     class Meta:
         unique_together = ('subscriber', 'author')
+        indexes = [
+            models.Index(
+                fields=['subscriber', 'id'], name='subscription_subscriber_id'
+            )
+        ]
 
     def __str__(self):
         return f"{self.subscriber} follows {self.author}"